@@ -0,0 +1,54 @@
+import queue
+import pymysql
+from contextlib import contextmanager
+from typing import Dict, Any
+
+class ConnectionPool:
+    """Small thread-safe pool of reusable pymysql connections"""
+
+    def __init__(self, db_config: Dict[str, Any], size: int = 4):
+        self.db_config = db_config
+        # LIFO so the most recently used (least likely to have timed out) socket is reused first
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for the duration of a with-block
+
+        Idle connections are pinged (reconnecting if the server dropped them) before
+        reuse. Anything not committed inside the block is rolled back.
+        """
+        try:
+            conn = self._idle.get_nowait()
+            conn.ping(reconnect=True)
+        except queue.Empty:
+            conn = pymysql.connect(**self.db_config)
+
+        try:
+            yield conn
+        finally:
+            # End any open transaction (a no-op after commit) so the next borrower
+            # never inherits uncommitted writes or a stale read snapshot
+            try:
+                conn.rollback()
+            except pymysql.MySQLError:
+                conn.close()
+            self._release(conn)
+
+    def _release(self, conn):
+        """Return a connection to the pool, closing it if the pool is full or it is dead"""
+        if not conn.open:
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self):
+        """Close every idle connection"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
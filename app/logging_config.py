@@ -1,6 +1,6 @@
 import os
-import json
 import logging
+import orjson
 from logging.handlers import RotatingFileHandler
 from datetime import datetime
 from typing import Dict, Any, Optional
@@ -25,7 +25,8 @@ class JSONFormatter(logging.Formatter):
         if hasattr(record, 'extra_data'):
             log_entry['extra'] = getattr(record, 'extra_data')
             
-        return json.dumps(log_entry)
+        # default=str keeps records with non-JSON extra_data loggable
+        return orjson.dumps(log_entry, default=str).decode('utf-8')
 
 def setup_logger(name: str, log_file: Optional[str] = None, level: int = logging.INFO) -> logging.Logger:
     """
@@ -58,7 +59,8 @@ def setup_logger(name: str, log_file: Optional[str] = None, level: int = logging
         file_handler = RotatingFileHandler(
             file_path,
             maxBytes=10*1024*1024,  # 10MB
-            backupCount=5
+            backupCount=5,
+            encoding='utf-8'  # orjson emits raw UTF-8 rather than \u escapes
         )
         file_handler.setFormatter(JSONFormatter())
         logger.addHandler(file_handler)
@@ -67,6 +69,8 @@ def setup_logger(name: str, log_file: Optional[str] = None, level: int = logging
 
 def log_with_extra(logger: logging.Logger, level: int, message: str, extra_data: Optional[Dict[str, Any]] = None):
     """Log message with extra structured data"""
+    if not logger.isEnabledFor(level):
+        return
     if extra_data:
         logger.log(level, message, extra={'extra_data': extra_data})
     else:
@@ -2,13 +2,41 @@ import os
 import sys
 import time
 import json
+import orjson
 import requests
 import pymysql
 import pymysql.cursors
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
 from .logging_config import get_monitor_logger, log_with_extra
 from .notifications import send_sync_alert
+from .db_pool import ConnectionPool
+
+# Both organization counters come from a single pass with conditional aggregation
+SQL_UNSYNCED_AND_STALE = """
+    SELECT SUM(synced_to_chatwoot = 0) AS unsynced_count,
+           SUM(synced_to_chatwoot = 0 AND updated_at < %s) AS stale_count
+    FROM organizations
+"""
+
+# The 6-hour error window lies inside the 24-hour one, so when there are no
+# recent syncs there are no consecutive errors either
+SQL_RECENT_SYNCS = """
+    SELECT status,
+           (SELECT COUNT(*) FROM sync_log
+            WHERE started_at >= %s AND status = 'error') AS consecutive_errors
+    FROM sync_log
+    WHERE started_at >= %s
+    ORDER BY started_at DESC
+    LIMIT 10
+"""
+
+SQL_DB_AND_SYNCED_COUNTS = (
+    "SELECT COUNT(*) AS db_count, SUM(synced_to_chatwoot = 1) AS synced_count FROM organizations"
+)
 
 class SyncMonitor:
     def __init__(self):
@@ -33,10 +61,35 @@ class SyncMonitor:
         
         if not all([self.pipedrive_api_key, self.chatwoot_api_key, self.db_config['password']]):
             raise ValueError("Missing required environment variables")
+        
+        self.db_pool = ConnectionPool(self.db_config, size=4)
+        
+        # Keep-alive sessions reused across checks; Chatwoot gets its own so its
+        # token header is never sent to Pipedrive
+        self.pipedrive_session = self._create_session()
+        self.chatwoot_session = self._create_session()
+        self.chatwoot_session.headers.update({'Api-Access-Token': self.chatwoot_api_key})
+    
+    def _create_session(self) -> requests.Session:
+        """Create an HTTP session with connection pooling and retries"""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=10,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=2,
+                status_forcelist=[429, 502, 503, 504],
+                raise_on_status=False
+            )
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
     
     def get_db_connection(self):
-        """Get database connection"""
-        return pymysql.connect(**self.db_config)
+        """Borrow a pooled database connection; use as a context manager"""
+        return self.db_pool.connection()
     
     def check_pipedrive_api(self) -> Tuple[bool, Dict[str, Any]]:
         """Check Pipedrive API connectivity and get Customer organizations count"""
@@ -48,24 +101,27 @@ class SyncMonitor:
                 'filter_id': 5  # Customer organizations
             }
             
-            response = requests.get(url, params=params, timeout=30)
+            # Stream so error bodies are never downloaded; a 200 body is read in full below
+            response = self.pipedrive_session.get(url, params=params, timeout=30, stream=True)
             
-            if response.status_code == 401:
-                return False, {'error': 'API authentication failed', 'status_code': 401}
-            elif response.status_code != 200:
+            if response.status_code != 200:
+                response.close()
+                if response.status_code == 401:
+                    return False, {'error': 'API authentication failed', 'status_code': 401}
                 return False, {'error': f'API request failed', 'status_code': response.status_code}
             
-            data = response.json()
+            data = orjson.loads(response.content)
             if not data.get('success'):
                 return False, {'error': 'API returned unsuccessful response', 'data': data}
             
             pagination = data.get('additional_data', {}).get('pagination', {})
             total_count = pagination.get('total_count', 0)
             
-            return True, {
+            result = {
                 'total_customer_orgs': total_count,
                 'api_status': 'healthy'
             }
+            return True, result
             
         except requests.exceptions.RequestException as e:
             return False, {'error': f'Network error: {str(e)}'}
@@ -76,25 +132,27 @@ class SyncMonitor:
         """Check Chatwoot API connectivity and get contact count"""
         try:
             url = f"{self.chatwoot_base_url}/contacts"
-            headers = {'Api-Access-Token': self.chatwoot_api_key}
             params = {'page': 1, 'per_page': 1}
             
-            response = requests.get(url, headers=headers, params=params, timeout=30)
+            # Stream so error bodies are never downloaded; a 200 body is read in full below
+            response = self.chatwoot_session.get(url, params=params, timeout=30, stream=True)
             
-            if response.status_code == 401:
-                return False, {'error': 'API authentication failed', 'status_code': 401}
-            elif response.status_code != 200:
+            if response.status_code != 200:
+                response.close()
+                if response.status_code == 401:
+                    return False, {'error': 'API authentication failed', 'status_code': 401}
                 return False, {'error': f'API request failed', 'status_code': response.status_code}
             
-            data = response.json()
+            data = orjson.loads(response.content)
             
             meta = data.get('meta', {})
             total_count = meta.get('count', 0)
             
-            return True, {
+            result = {
                 'total_contacts': total_count,
                 'api_status': 'healthy'
             }
+            return True, result
             
         except requests.exceptions.RequestException as e:
             return False, {'error': f'Network error: {str(e)}'}
@@ -104,41 +162,29 @@ class SyncMonitor:
     def check_database_sync_status(self) -> Tuple[bool, Dict[str, Any]]:
         """Check database for sync status and potential issues"""
         try:
-            conn = self.get_db_connection()
-            
-            with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-                cursor.execute("SELECT COUNT(*) as unsynced_count FROM organizations WHERE synced_to_chatwoot = 0")
-                unsynced_result = cursor.fetchone()
-                unsynced_count = unsynced_result['unsynced_count'] if unsynced_result else 0
+            with self.get_db_connection() as conn, conn.cursor(pymysql.cursors.DictCursor) as cursor:
+                # One "now" so every window is measured from the same instant
+                now = datetime.now()
+                cutoff_stale = now - timedelta(hours=self.max_sync_age_hours)
+                cutoff_6h = now - timedelta(hours=6)
+                cutoff_24h = now - timedelta(hours=24)
                 
-                cutoff_time = datetime.now() - timedelta(hours=self.max_sync_age_hours)
-                cursor.execute(
-                    "SELECT COUNT(*) as stale_count FROM organizations WHERE synced_to_chatwoot = 0 AND updated_at < %s",
-                    (cutoff_time,)
-                )
-                stale_result = cursor.fetchone()
-                stale_count = stale_result['stale_count'] if stale_result else 0
+                cursor.execute(SQL_UNSYNCED_AND_STALE, (cutoff_stale,))
+                org_counts = cursor.fetchone()
+                # SUM() yields a Decimal, or NULL on an empty table
+                unsynced_count = int(org_counts['unsynced_count'] or 0)
+                stale_count = int(org_counts['stale_count'] or 0)
                 
-                cursor.execute(
-                    "SELECT * FROM sync_log WHERE started_at >= %s ORDER BY started_at DESC LIMIT 10",
-                    (datetime.now() - timedelta(hours=24),)
-                )
+                cursor.execute(SQL_RECENT_SYNCS, (cutoff_6h, cutoff_24h))
                 recent_syncs = cursor.fetchall()
                 
                 if recent_syncs:
                     error_syncs = [s for s in recent_syncs if s['status'] == 'error']
                     error_rate = (len(error_syncs) / len(recent_syncs)) * 100
+                    consecutive_errors = recent_syncs[0]['consecutive_errors']
                 else:
                     error_rate = 0
-                
-                cursor.execute(
-                    "SELECT COUNT(*) as consecutive_errors FROM sync_log WHERE started_at >= %s AND status = 'error'",
-                    (datetime.now() - timedelta(hours=6),)
-                )
-                consecutive_errors_result = cursor.fetchone()
-                consecutive_errors = consecutive_errors_result['consecutive_errors'] if consecutive_errors_result else 0
-                
-                conn.close()
+                    consecutive_errors = 0
                 
                 issues = []
                 if stale_count > 0:
@@ -162,24 +208,25 @@ class SyncMonitor:
         except Exception as e:
             return False, {'error': f'Database check failed: {str(e)}'}
     
-    def check_data_consistency(self) -> Tuple[bool, Dict[str, Any]]:
-        """Check for data mismatches between Pipedrive and local database"""
+    def check_data_consistency(self, pipedrive_data: Optional[Dict[str, Any]] = None) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Check for data mismatches between Pipedrive and local database
+        
+        Args:
+            pipedrive_data: Result of a healthy check_pipedrive_api call to reuse;
+                            the API is queried when not provided
+        """
         try:
-            pipedrive_healthy, pipedrive_data = self.check_pipedrive_api()
-            if not pipedrive_healthy:
-                return False, {'error': 'Cannot check consistency - Pipedrive API unavailable'}
+            if pipedrive_data is None:
+                pipedrive_healthy, pipedrive_data = self.check_pipedrive_api()
+                if not pipedrive_healthy:
+                    return False, {'error': 'Cannot check consistency - Pipedrive API unavailable'}
             
-            conn = self.get_db_connection()
-            with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-                cursor.execute("SELECT COUNT(*) as db_count FROM organizations")
-                db_result = cursor.fetchone()
-                db_count = db_result['db_count']
-                
-                cursor.execute("SELECT COUNT(*) as synced_count FROM organizations WHERE synced_to_chatwoot = 1")
-                synced_result = cursor.fetchone()
-                synced_count = synced_result['synced_count']
-            
-            conn.close()
+            with self.get_db_connection() as conn, conn.cursor(pymysql.cursors.DictCursor) as cursor:
+                cursor.execute(SQL_DB_AND_SYNCED_COUNTS)
+                counts = cursor.fetchone()
+                db_count = counts['db_count']
+                synced_count = int(counts['synced_count'] or 0)
             
             pipedrive_count = pipedrive_data.get('total_customer_orgs', 0)
             
@@ -212,8 +259,32 @@ class SyncMonitor:
             'checks': {}
         }
         
-        self.logger.info("Checking Pipedrive API connectivity")
-        pipedrive_healthy, pipedrive_data = self.check_pipedrive_api()
+        # The checks are independent I/O, so run them side by side; the consistency
+        # check reuses the Pipedrive result once it is available
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            self.logger.info("Checking Pipedrive API connectivity")
+            pipedrive_future = executor.submit(self.check_pipedrive_api)
+            self.logger.info("Checking Chatwoot API connectivity")
+            chatwoot_future = executor.submit(self.check_chatwoot_api)
+            self.logger.info("Checking database sync status")
+            db_future = executor.submit(self.check_database_sync_status)
+            
+            pipedrive_healthy, pipedrive_data = pipedrive_future.result()
+            self.logger.info("Checking data consistency")
+            if pipedrive_healthy:
+                consistency_future = executor.submit(self.check_data_consistency, pipedrive_data)
+            else:
+                # Pipedrive just failed; probing it again for the consistency check would only repeat that
+                consistency_future = None
+            
+            chatwoot_healthy, chatwoot_data = chatwoot_future.result()
+            db_healthy, db_data = db_future.result()
+            if consistency_future is not None:
+                consistency_healthy, consistency_data = consistency_future.result()
+            else:
+                consistency_healthy = False
+                consistency_data = {'error': 'Cannot check consistency - Pipedrive API unavailable'}
+        
         results['checks']['pipedrive_api'] = {
             'status': 'healthy' if pipedrive_healthy else 'unhealthy',
             'data': pipedrive_data
@@ -230,8 +301,6 @@ class SyncMonitor:
             )
             results['overall_status'] = 'unhealthy'
         
-        self.logger.info("Checking Chatwoot API connectivity")
-        chatwoot_healthy, chatwoot_data = self.check_chatwoot_api()
         results['checks']['chatwoot_api'] = {
             'status': 'healthy' if chatwoot_healthy else 'unhealthy',
             'data': chatwoot_data
@@ -248,8 +317,6 @@ class SyncMonitor:
             )
             results['overall_status'] = 'unhealthy'
         
-        self.logger.info("Checking database sync status")
-        db_healthy, db_data = self.check_database_sync_status()
         results['checks']['database_sync'] = {
             'status': 'healthy' if db_healthy else 'unhealthy',
             'data': db_data
@@ -267,8 +334,6 @@ class SyncMonitor:
                 )
             results['overall_status'] = 'unhealthy'
         
-        self.logger.info("Checking data consistency")
-        consistency_healthy, consistency_data = self.check_data_consistency()
         results['checks']['data_consistency'] = {
             'status': 'healthy' if consistency_healthy else 'unhealthy',
             'data': consistency_data
@@ -286,7 +351,7 @@ class SyncMonitor:
                 )
             results['overall_status'] = 'unhealthy'
         
-        self.logger.info(f"Health check completed - Overall status: {results['overall_status']}")
+        self.logger.info("Health check completed - Overall status: %s", results['overall_status'])
         log_with_extra(self.logger, 20, "Health check results", results)
         
         return results
@@ -296,6 +361,7 @@ def main():
     try:
         monitor = SyncMonitor()
         results = monitor.run_health_check()
+        monitor.db_pool.close()
         
         print(f"Health Check Results - {results['timestamp']}")
         print(f"Overall Status: {results['overall_status'].upper()}")
@@ -1,15 +1,48 @@
 import os
+import html
 import json
-import time
+import queue
+import atexit
+import threading
+import orjson
 import requests
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
 from typing import Dict, Any, Optional, Union
 
+ALERT_EMOJI = {"ERROR": "🚨", "WARNING": "⚠️"}
+CARD_TITLE = "Pipedrive-Chatwoot Sync Alert"
+CARD_IMAGE_URL = "https://developers.google.com/chat/images/quickstart-app-avatar.png"
+
+@lru_cache(maxsize=64)
+def _label(key: str) -> str:
+    """Human-readable label for a details key; the same keys recur on every alert"""
+    return key.replace('_', ' ').title()
+
 class GoogleChatNotifier:
     def __init__(self):
         self.webhook_url = os.getenv('SUPPORT_GOOGLE_CHAT')
         if not self.webhook_url:
             raise ValueError("SUPPORT_GOOGLE_CHAT environment variable not set")
+        
+        # Reuse the TLS connection to the webhook across alerts and let urllib3 handle
+        # throttling/outages, honouring Retry-After instead of a fixed sleep
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=4,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=2,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=frozenset(['POST']),
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+        )
+        self.session.mount('https://', adapter)
     
     def send_alert(self, 
                    script_name: str,
@@ -27,28 +60,21 @@ class GoogleChatNotifier:
             details: Additional details like affected contacts/labels
             alert_level: ERROR, WARNING, or INFO
         """
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S UTC")
-        
-        alert_data = {
-            "timestamp": timestamp,
-            "script": script_name,
-            "level": alert_level,
-            "error_type": error_type,
-            "message": message
-        }
+        emoji = ALERT_EMOJI.get(alert_level, "ℹ️")
         
-        if details:
-            alert_data.update(details)
+        # Informational alerts render as a plain chat line; only problems get the full card
+        if alert_level == "INFO":
+            return self._send_with_retry({"text": f"{emoji} {script_name} {error_type}: {message}"})
         
-        emoji = "🚨" if alert_level == "ERROR" else "⚠️" if alert_level == "WARNING" else "ℹ️"
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S UTC")
         
         card_message = {
             "text": f"{emoji} Chatwoot Sync Alert - {error_type}",
             "cards": [{
                 "header": {
-                    "title": f"Pipedrive-Chatwoot Sync Alert",
+                    "title": CARD_TITLE,
                     "subtitle": f"{script_name} - {error_type}",
-                    "imageUrl": "https://developers.google.com/chat/images/quickstart-app-avatar.png"
+                    "imageUrl": CARD_IMAGE_URL
                 },
                 "sections": [{
                     "widgets": [
@@ -87,48 +113,32 @@ class GoogleChatNotifier:
         }
         
         if details:
-            details_widgets = []
-            for key, value in details.items():
-                details_widgets.append({
-                    "keyValue": {
-                        "topLabel": key.replace('_', ' ').title(),
-                        "content": str(value)
-                    }
-                })
-            
+            details_text = '<br>'.join(
+                f"<b>{_label(key)}:</b> {html.escape(str(value))}" for key, value in details.items()
+            )
             card_message["cards"][0]["sections"].append({
                 "header": "Details",
-                "widgets": details_widgets
+                "widgets": [{"textParagraph": {"text": details_text}}]
             })
         
         return self._send_with_retry(card_message)
     
-    def _send_with_retry(self, message: Dict[str, Any], max_retries: int = 3) -> bool:
-        """Send message with exponential backoff retry logic"""
-        for attempt in range(max_retries):
-            try:
-                response = requests.post(
-                    self.webhook_url,
-                    json=message,
-                    headers={'Content-Type': 'application/json'},
-                    timeout=30
-                )
-                
-                if response.status_code == 200:
-                    return True
-                elif response.status_code == 429:
-                    wait_time = (2 ** attempt) * 5
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    print(f"Google Chat notification failed: {response.status_code} - {response.text}")
-                    
-            except requests.exceptions.RequestException as e:
-                print(f"Error sending Google Chat notification (attempt {attempt + 1}): {e}")
-                
-                if attempt < max_retries - 1:
-                    wait_time = (2 ** attempt) * 2
-                    time.sleep(wait_time)
+    def _send_with_retry(self, message: Dict[str, Any]) -> bool:
+        """Send message; retries and backoff are handled by the session adapter"""
+        try:
+            response = self.session.post(
+                self.webhook_url,
+                data=orjson.dumps(message),
+                headers={'Content-Type': 'application/json'},
+                timeout=30
+            )
+            
+            if response.status_code == 200:
+                return True
+            print(f"Google Chat notification failed: {response.status_code} - {response.text}")
+            
+        except requests.exceptions.RequestException as e:
+            print(f"Error sending Google Chat notification: {e}")
         
         return False
     
@@ -153,21 +163,68 @@ class GoogleChatNotifier:
         
         return self._send_with_retry(test_message)
 
-def send_sync_alert(script_name: str, error_type: str, message: str, 
-                   details: Optional[Dict[str, Any]] = None, alert_level: str = "ERROR") -> bool:
-    """Convenience function to send sync alerts"""
+# Alerts are delivered by a single background thread so a slow or failing webhook
+# never holds up the sync or the health checks
+_alert_queue = queue.Queue(maxsize=256)
+_alert_worker = None
+_alert_worker_lock = threading.Lock()
+
+@lru_cache(maxsize=1)
+def _get_notifier() -> GoogleChatNotifier:
+    """Shared notifier so its pooled webhook connection survives between alerts"""
+    return GoogleChatNotifier()
+
+def _deliver_alert(script_name: str, error_type: str, message: str,
+                   details: Optional[Dict[str, Any]], alert_level: str) -> bool:
+    """Send an alert synchronously"""
     try:
-        notifier = GoogleChatNotifier()
-        return notifier.send_alert(script_name, error_type, message, details, alert_level)
+        return _get_notifier().send_alert(script_name, error_type, message, details, alert_level)
     except Exception as e:
         print(f"Failed to send alert: {e}")
         return False
 
+def _drain_alert_queue():
+    """Background loop delivering queued alerts"""
+    while True:
+        alert = _alert_queue.get()
+        try:
+            _deliver_alert(*alert)
+        finally:
+            _alert_queue.task_done()
+
+def _ensure_alert_worker():
+    """Start the alert delivery thread on first use"""
+    global _alert_worker
+    with _alert_worker_lock:
+        if _alert_worker is None:
+            _alert_worker = threading.Thread(target=_drain_alert_queue, name='alert-sender', daemon=True)
+            _alert_worker.start()
+            atexit.register(flush_alerts)
+
+def flush_alerts():
+    """Block until every queued alert has been delivered (registered to run at exit)"""
+    _alert_queue.join()
+
+def send_sync_alert(script_name: str, error_type: str, message: str, 
+                   details: Optional[Dict[str, Any]] = None, alert_level: str = "ERROR") -> bool:
+    """
+    Convenience function to send sync alerts
+    
+    Queues the alert for background delivery and returns immediately. Returns
+    False if the queue is full and the alert was dropped.
+    """
+    _ensure_alert_worker()
+    try:
+        _alert_queue.put_nowait((script_name, error_type, message, details, alert_level))
+        return True
+    except queue.Full:
+        print(f"Alert queue full, dropping alert: {script_name} - {error_type}")
+        return False
+
 def test_notifications() -> bool:
     """Test notification system"""
     try:
-        notifier = GoogleChatNotifier()
-        return notifier.test_connection()
+        return _get_notifier().test_connection()
     except Exception as e:
         print(f"Failed to test notifications: {e}")
         return False
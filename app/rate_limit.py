@@ -0,0 +1,72 @@
+import time
+import threading
+from requests.adapters import HTTPAdapter
+
+# X-RateLimit-Reset values above this are epoch timestamps (2001-09-09), below it
+# they are seconds until the reset
+EPOCH_THRESHOLD = 1e9
+# Longest pause a reset header can impose; rate-limit windows are seconds to minutes
+MAX_RESET_DELAY = 3600.0
+
+
+class RateLimiter:
+    """Thread-safe token bucket that also honours API rate-limit headers"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst if burst else max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def observe(self, response, *args, **kwargs):
+        """Response hook: pause until the quota resets once the API reports it exhausted"""
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        reset = response.headers.get('X-RateLimit-Reset')
+        if remaining is None or reset is None:
+            return
+
+        try:
+            remaining = int(remaining)
+            reset = float(reset)
+        except ValueError:
+            return
+
+        if remaining > 0:
+            return
+
+        # Reset is sent either as an epoch timestamp or as seconds until reset; an epoch
+        # that has already passed (clock skew, late response) means no wait at all
+        if reset > EPOCH_THRESHOLD:
+            reset -= time.time()
+        delay = min(max(0.0, reset), MAX_RESET_DELAY)
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """HTTPAdapter that takes a token from a RateLimiter before every request it sends"""
+
+    def __init__(self, rate_limiter, *args, **kwargs):
+        self.rate_limiter = rate_limiter
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        self.rate_limiter.acquire()
+        return super().send(request, **kwargs)
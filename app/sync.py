@@ -6,19 +6,26 @@ Syncs ONLY Customer organizations (label 5) from Pipedrive to Chatwoot
 """
 
 import os
-import sys
-import time
-import json
+import re
+import socket
 import logging
+import orjson
 import requests
 import pymysql
 import pymysql.cursors
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
+from itertools import repeat
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
-sys.path.append('/app')
-from logging_config import get_sync_logger, log_with_extra  # noqa: E402
-from notifications import send_sync_alert  # noqa: E402
+from logging_config import get_sync_logger, log_with_extra
+from notifications import send_sync_alert
+from db_pool import ConnectionPool
+from rate_limit import RateLimiter, RateLimitedAdapter
 
 # Load environment variables
 load_dotenv()
@@ -29,6 +36,32 @@ CHATWOOT_API_KEY = os.getenv('CHATWOOT_API_KEY')
 CHATWOOT_BASE_URL = os.getenv('CHATWOOT_BASE_URL', 'https://support.liveport.com.au/api/v1/accounts/2')
 PIPEDRIVE_BASE_URL = os.getenv('PIPEDRIVE_BASE_URL', 'https://api.pipedrive.com/v1')
 
+# Optional saved Pipedrive filter matching Customer organizations; when set, the label
+# filter runs server-side and non-customer organizations are never downloaded
+PIPEDRIVE_CUSTOMER_FILTER_ID = os.getenv('PIPEDRIVE_CUSTOMER_FILTER_ID')
+
+# Rows per multi-row INSERT in store_organizations; a few MB per statement at most
+INSERT_BATCH_SIZE = int(os.getenv('INSERT_BATCH_SIZE', '1000'))
+
+# Pipedrive key of the organization-level "Main Phone Number" custom field
+MAIN_PHONE_FIELD_KEY = 'a677b0cd218332b9f490ce565603a8d2efc2ff65'
+
+# Pipedrive key of the "Common Support Link" custom field; it is only stored inside
+# organizations.data, where sync_common_support.py reads it
+COMMON_SUPPORT_LINK_FIELD = 'f9c6c562ac9d61e1880fe4b5675d3a64f2bbcc6c'
+
+# Number of organizations synced to Chatwoot concurrently
+MAX_WORKERS = int(os.getenv('MAX_WORKERS', '4'))
+
+# The Customer Database inbox practically never changes; re-resolve it once a day
+INBOX_CACHE_TTL_HOURS = int(os.getenv('INBOX_CACHE_TTL_HOURS', '24'))
+
+# Requests per second allowed against each API; bursts up to this size are let through
+RATE_LIMIT_PER_SECOND = float(os.getenv('RATE_LIMIT_PER_SECOND', '3'))
+
+# Everything except digits and '+' is dropped from phone numbers
+PHONE_STRIP_RE = re.compile(r'[^\d+]')
+
 # Database configuration
 DB_CONFIG = {
     'host': os.getenv('MYSQL_HOST', 'localhost'),
@@ -40,53 +73,181 @@ DB_CONFIG = {
 }
 
 
+class ThrottleRetry(Retry):
+    """
+    Retry that also retries non-idempotent requests, but only on 429
+
+    A throttled request was never processed, so re-sending a POST cannot create a
+    duplicate; 5xx responses still only retry idempotent methods.
+    """
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if status_code == 429:
+            return True
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+# Probe idle pooled sockets so a NAT or proxy idle timeout can't silently drop them
+# while the sync is busy with the database between API phases
+KEEPALIVE_SOCKET_OPTIONS = HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+if hasattr(socket, 'TCP_KEEPIDLE'):
+    KEEPALIVE_SOCKET_OPTIONS += [
+        (socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30),
+        (socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10),
+        (socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3),
+    ]
+
+
+class KeepAliveAdapter(RateLimitedAdapter):
+    """RateLimitedAdapter whose pooled connections enable TCP keep-alive"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = KEEPALIVE_SOCKET_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
+
+
+def create_http_session(pool_size=MAX_WORKERS):
+    """
+    Create a keep-alive session that retries throttled and failed idempotent requests
+
+    Every request waits for a token from the session's own rate limiter, which also
+    pauses when the API reports its quota exhausted. Each API gets its own session,
+    so one cannot use up the other's connections or request budget.
+    """
+    rate_limiter = RateLimiter(RATE_LIMIT_PER_SECOND)
+    session = requests.Session()
+    session.hooks['response'].append(rate_limiter.observe)
+    adapter = KeepAliveAdapter(
+        rate_limiter,
+        pool_connections=1,
+        pool_maxsize=pool_size,
+        # Block rather than open overflow sockets, so pool_size is a hard cap on
+        # in-flight requests to this API however many threads share the session
+        pool_block=True,
+        max_retries=ThrottleRetry(
+            total=6,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+# One session per API so each keeps its own warm connections and credentials
+PIPEDRIVE_SESSION = create_http_session()
+PIPEDRIVE_SESSION.params = {'api_token': PIPEDRIVE_API_KEY}
+# Sized for each worker's contact update plus its concurrent inbox assignment
+CHATWOOT_SESSION = create_http_session(pool_size=MAX_WORKERS * 2)
+# Every Chatwoot call speaks JSON; bodies are encoded with orjson and sent as data=,
+# so the content type is set here once rather than per request
+CHATWOOT_SESSION.headers.update({
+    'Api-Access-Token': CHATWOOT_API_KEY,
+    'Content-Type': 'application/json',
+    'Accept': 'application/json'
+})
+
+# Runs inbox assignments for existing contacts alongside their update
+ASSIGN_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+
+
 def setup_logging():
     """Set up logging using centralized configuration"""
     return get_sync_logger()
 
 
+# One warm connection is reused across the timestamp, store and sync steps of a run
+DB_POOL = ConnectionPool(DB_CONFIG, size=4)
+
+
 def get_db_connection():
-    """Get database connection"""
-    return pymysql.connect(**DB_CONFIG)
+    """Borrow a pooled database connection; use as a context manager"""
+    return DB_POOL.connection()
+
+
+@lru_cache(maxsize=1)
+def get_phone_field_keys():
+    """
+    Keys of the organization fields that can hold a phone number, or None if unknown
+
+    The field schema is fetched once per run; organizations are then checked for
+    these keys only instead of scanning every field they carry.
+    """
+    logger = logging.getLogger(__name__)
+
+    try:
+        response = PIPEDRIVE_SESSION.get(f"{PIPEDRIVE_BASE_URL}/organizationFields",
+                                         params={'limit': 500}, timeout=30)
+        response.raise_for_status()
+        fields = orjson.loads(response.content).get('data') or []
+    except Exception as e:
+        logger.warning("Could not load Pipedrive organization fields, scanning all fields: %s", e)
+        return None
+
+    return tuple(
+        field['key'] for field in fields
+        if any(word in field.get('key', '').lower() for word in ('phone', 'main'))
+    )
+
+
+def get_organization_custom_field_phone(org_id):
+    """Get an organization's phone number from its custom fields, or None if it has none"""
+    logger = logging.getLogger(__name__)
+
+    try:
+        org_response = PIPEDRIVE_SESSION.get(f"{PIPEDRIVE_BASE_URL}/organizations/{org_id}", timeout=30)
+        if org_response.status_code != 200:
+            return None
+
+        org_data = orjson.loads(org_response.content).get('data', {})
+
+        main_phone = org_data.get(MAIN_PHONE_FIELD_KEY, '').strip()
+
+        if main_phone:
+            logger.debug("Found Main Phone Number custom field for org %s: %s", org_id, main_phone)
+            return main_phone
+
+        # Only the phone-like fields are checked when the field schema is known
+        phone_field_keys = get_phone_field_keys()
+        candidate_keys = phone_field_keys if phone_field_keys is not None else org_data.keys()
+
+        for key in candidate_keys:
+            value = org_data.get(key)
+            if value and isinstance(value, str):
+                if ('phone' in key.lower() or 'main' in key.lower()) and any(char.isdigit() for char in value):
+                    logger.debug("Found phone in custom field %s for org %s: %s", key, org_id, value)
+                    return value.strip()
+
+    except Exception as e:
+        logger.error("Error checking custom fields for org %s: %s", org_id, e)
+
+    return None
 
 
 def get_organization_phone_number(org_id):
     """Get phone number for an organization from custom fields first, then associated persons"""
     logger = logging.getLogger(__name__)
 
-    try:
-        # Step 1: Check organization-level custom fields first
-        org_params = {'api_token': PIPEDRIVE_API_KEY}
-        org_response = requests.get(f"{PIPEDRIVE_BASE_URL}/organizations/{org_id}",
-                                    params=org_params, timeout=30)
-        if org_response.status_code == 200:
-            org_data = org_response.json().get('data', {})
-
-            main_phone_hash = 'a677b0cd218332b9f490ce565603a8d2efc2ff65'
-            main_phone = org_data.get(main_phone_hash, '').strip()
-
-            if main_phone:
-                logger.info(f"Found Main Phone Number custom field for org {org_id}: {main_phone}")
-                return main_phone
-
-            for key, value in org_data.items():
-                if value and isinstance(value, str):
-                    if ('phone' in key.lower() or 'main' in key.lower()) and any(char.isdigit() for char in value):
-                        logger.info(f"Found phone in custom field {key} for org {org_id}: {value}")
-                        return value.strip()
+    # Step 1: Check organization-level custom fields first
+    custom_field_phone = get_organization_custom_field_phone(org_id)
+    if custom_field_phone:
+        return custom_field_phone
 
+    try:
         # Step 2: Fall back to person-level phone data (existing logic)
-        logger.debug(f"No organization-level phone found for org {org_id}, checking persons...")
+        logger.debug("No organization-level phone found for org %s, checking persons...", org_id)
 
         params = {
-            'api_token': PIPEDRIVE_API_KEY,
             'org_id': org_id
         }
 
-        response = requests.get(f"{PIPEDRIVE_BASE_URL}/persons", params=params, timeout=30)
+        response = PIPEDRIVE_SESSION.get(f"{PIPEDRIVE_BASE_URL}/persons", params=params, timeout=30)
         response.raise_for_status()
 
-        data = response.json()
+        data = orjson.loads(response.content)
         persons = data.get('data', [])
 
         for person in persons:
@@ -106,150 +267,131 @@ def get_organization_phone_number(org_id):
                                 break
 
                 if primary_phone:
-                    logger.info(f"Found primary phone from person for org {org_id}: {primary_phone}")
+                    logger.debug("Found primary phone from person for org %s: %s", org_id, primary_phone)
                     return primary_phone
                 elif first_phone:
-                    logger.info(f"Found phone from person for org {org_id}: {first_phone}")
+                    logger.debug("Found phone from person for org %s: %s", org_id, first_phone)
                     return first_phone
 
-        logger.info(f"No phone number found for org {org_id}")
+        logger.debug("No phone number found for org %s", org_id)
         return ""
 
     except Exception as e:
-        logger.error(f"Error fetching phone for org {org_id}: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
+        logger.exception("Error fetching phone for org %s: %s", org_id, e)
         return ""
 
 
-def get_organizations_phone_numbers_batch(org_ids):
-    """Get phone numbers for multiple organizations, checking custom fields first, then persons"""
+def get_person_phones_batch(batch_org_ids, batch_number):
+    """
+    Get {org_id: phone} from the persons of up to 20 organizations in one request
+
+    Falls back to looking organizations up one at a time if the batch request fails.
+    """
     logger = logging.getLogger(__name__)
-    phone_map = {}
+    org_phones = {}
 
-    # First, check organization-level custom fields for all organizations
-    logger.info("Checking organization-level custom fields for phone numbers...")
-    for org_id in org_ids:
-        try:
-            org_params = {'api_token': PIPEDRIVE_API_KEY}
-            org_response = requests.get(f"{PIPEDRIVE_BASE_URL}/organizations/{org_id}",
-                                        params=org_params, timeout=30)
-            if org_response.status_code == 200:
-                org_data = org_response.json().get('data', {})
+    try:
+        params = {
+            'org_id': ','.join(batch_org_ids),
+            'limit': 500  # Increase limit to get more persons per request
+        }
+
+        response = PIPEDRIVE_SESSION.get(f"{PIPEDRIVE_BASE_URL}/persons", params=params, timeout=30)
+        response.raise_for_status()
 
-                main_phone_hash = 'a677b0cd218332b9f490ce565603a8d2efc2ff65'
-                main_phone = org_data.get(main_phone_hash, '').strip()
+        data = orjson.loads(response.content)
+        persons = data.get('data', [])
+
+        logger.info("Person batch %s: Fetched %s persons for %s organizations",
+                    batch_number, len(persons), len(batch_org_ids))
 
-                if main_phone:
-                    phone_map[org_id] = main_phone
-                    logger.info(f"Found Main Phone Number custom field for org {org_id}: {main_phone}")
-                    continue
+        wanted_org_ids = set(batch_org_ids)
+        for person in persons:
+            org_id = person.get('org_id', {})
+            if isinstance(org_id, dict):
+                org_id_value = str(org_id.get('value', ''))
+            else:
+                org_id_value = str(org_id) if org_id else ''
+
+            if org_id_value and org_id_value in wanted_org_ids:
+                phone_data = person.get('phone', [])
+                if phone_data and isinstance(phone_data, list):
+                    for phone_entry in phone_data:
+                        if isinstance(phone_entry, dict):
+                            phone_value = phone_entry.get('value', '').strip()
+                            if phone_value:
+                                if org_id_value not in org_phones:
+                                    org_phones[org_id_value] = phone_value
+                                elif phone_entry.get('primary', False):
+                                    org_phones[org_id_value] = phone_value
+                                    break
 
-                for key, value in org_data.items():
-                    if value and isinstance(value, str):
-                        if ('phone' in key.lower() or 'main' in key.lower()) and any(char.isdigit() for char in value):
-                            phone_map[org_id] = value.strip()
-                            logger.info(f"Found phone in custom field {key} for org {org_id}: {value}")
-                            break
+    except Exception as e:
+        logger.error("Error fetching phones for person batch %s: %s", batch_number, e)
+        for org_id in batch_org_ids:
+            if org_id not in org_phones:
+                org_phones[org_id] = get_organization_phone_number(org_id)
 
-            time.sleep(0.2)  # Small delay to avoid rate limiting
+    return org_phones
 
-        except Exception as e:
-            logger.error(f"Error checking custom fields for org {org_id}: {e}")
+
+def get_organizations_phone_numbers_batch(org_ids):
+    """Get phone numbers for multiple organizations, checking custom fields first, then persons"""
+    logger = logging.getLogger(__name__)
+    phone_map = {}
+
+    # First, check organization-level custom fields for all organizations; each is a
+    # separate GET, so they are issued side by side within the session's rate limit
+    logger.info("Checking organization-level custom fields for phone numbers...")
+    get_phone_field_keys()  # load the field schema once, before the workers need it
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for org_id, phone in zip(org_ids, executor.map(get_organization_custom_field_phone, org_ids)):
+            if phone:
+                phone_map[org_id] = phone
 
     remaining_org_ids = [org_id for org_id in org_ids if org_id not in phone_map]
 
     if remaining_org_ids:
-        logger.info(f"Checking person-level phone data for {len(remaining_org_ids)} organizations...")
+        logger.info("Checking person-level phone data for %s organizations...", len(remaining_org_ids))
         batch_size = 20  # Process in smaller batches to avoid URL length limits
+        batches = [remaining_org_ids[i:i + batch_size] for i in range(0, len(remaining_org_ids), batch_size)]
 
-        for i in range(0, len(remaining_org_ids), batch_size):
-            batch_org_ids = remaining_org_ids[i:i + batch_size]
-
-            try:
-                params = {
-                    'api_token': PIPEDRIVE_API_KEY,
-                    'org_id': ','.join(batch_org_ids),
-                    'limit': 500  # Increase limit to get more persons per request
-                }
-
-                response = requests.get(f"{PIPEDRIVE_BASE_URL}/persons", params=params, timeout=30)
-                response.raise_for_status()
-
-                data = response.json()
-                persons = data.get('data', [])
-
-                logger.info(f"Person batch {i // batch_size + 1}: Fetched {len(persons)} persons "
-                            f"for {len(batch_org_ids)} organizations")
-
-                org_phones = {}
-                for person in persons:
-                    org_id = person.get('org_id', {})
-                    if isinstance(org_id, dict):
-                        org_id_value = str(org_id.get('value', ''))
-                    else:
-                        org_id_value = str(org_id) if org_id else ''
-
-                    if org_id_value and org_id_value in batch_org_ids:
-                        phone_data = person.get('phone', [])
-                        if phone_data and isinstance(phone_data, list):
-                            for phone_entry in phone_data:
-                                if isinstance(phone_entry, dict):
-                                    phone_value = phone_entry.get('value', '').strip()
-                                    if phone_value:
-                                        if org_id_value not in org_phones:
-                                            org_phones[org_id_value] = phone_value
-                                        elif phone_entry.get('primary', False):
-                                            org_phones[org_id_value] = phone_value
-                                            break
-
+        # The person batches are independent requests, so they go out side by side too
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            for org_phones in executor.map(get_person_phones_batch, batches, range(1, len(batches) + 1)):
                 phone_map.update(org_phones)
 
-                if i + batch_size < len(remaining_org_ids):
-                    time.sleep(1)
-
-            except Exception as e:
-                logger.error(f"Error fetching phones for person batch {i // batch_size + 1}: {e}")
-                for org_id in batch_org_ids:
-                    if org_id not in phone_map:
-                        phone_map[org_id] = get_organization_phone_number(org_id)
-                        time.sleep(0.5)
-
-    logger.info(f"Retrieved phone numbers for {len(phone_map)} out of {len(org_ids)} organizations")
+    logger.info("Retrieved phone numbers for %s out of %s organizations", len(phone_map), len(org_ids))
     return phone_map
 
 
 def get_last_sync_timestamp():
     """Get the last sync timestamp for incremental sync"""
     logger = logging.getLogger(__name__)
-    conn = get_db_connection()
 
     try:
-        with conn.cursor() as cursor:
+        with get_db_connection() as conn, conn.cursor() as cursor:
             cursor.execute(
                 "SELECT last_sync_timestamp FROM sync_metadata WHERE sync_type = 'organizations'"
             )
             result = cursor.fetchone()
             if result and result[0]:
-                logger.info(f"Last sync timestamp: {result[0]}")
+                logger.info("Last sync timestamp: %s", result[0])
                 return result[0].strftime('%Y-%m-%d %H:%M:%S')
             else:
                 logger.info("No previous sync timestamp found, performing full sync")
                 return None
     except Exception as e:
-        logger.warning(f"Error getting last sync timestamp: {e}")
+        logger.warning("Error getting last sync timestamp: %s", e)
         return None
-    finally:
-        conn.close()
 
 
 def update_sync_timestamp():
     """Update the last sync timestamp"""
     logger = logging.getLogger(__name__)
-    conn = get_db_connection()
 
     try:
-        with conn.cursor() as cursor:
+        with get_db_connection() as conn, conn.cursor() as cursor:
             cursor.execute("""
                 INSERT INTO sync_metadata (sync_type, last_sync_timestamp)
                 VALUES ('organizations', NOW())
@@ -259,99 +401,158 @@ def update_sync_timestamp():
             conn.commit()
             logger.info("Updated sync timestamp")
     except Exception as e:
-        logger.error(f"Error updating sync timestamp: {e}")
-    finally:
-        conn.close()
+        logger.error("Error updating sync timestamp: %s", e)
+
+
+def get_organizations_page(start, limit, since_timestamp):
+    """Get one page of organizations from Pipedrive as parsed JSON"""
+    params = {
+        'start': start,
+        'limit': limit
+    }
+
+    if since_timestamp:
+        params['since'] = since_timestamp
+
+    if PIPEDRIVE_CUSTOMER_FILTER_ID:
+        params['filter_id'] = PIPEDRIVE_CUSTOMER_FILTER_ID
+
+    response = PIPEDRIVE_SESSION.get(f"{PIPEDRIVE_BASE_URL}/organizations", params=params, timeout=30)
+    response.raise_for_status()
+    return orjson.loads(response.content)
+
+
+def iter_organization_pages(since_timestamp, limit=100):
+    """
+    Yield (page_number, page_data) for every page of organizations, in order
+
+    The remaining pages are fetched side by side (within the Pipedrive rate limit):
+    all at once when the first page reports total_count, otherwise through a
+    window of speculative requests for the next MAX_WORKERS pages.
+    """
+    data = get_organizations_page(0, limit, since_timestamp)
+    yield 1, data
+
+    pagination = data.get('additional_data', {}).get('pagination', {})
+    if not pagination.get('more_items_in_collection', False):
+        return
+
+    start = pagination.get('next_start', limit)
+    total_count = pagination.get('total_count')
+
+    if total_count:
+        starts = range(start, total_count, limit)
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            pages = executor.map(get_organizations_page, starts, repeat(limit), repeat(since_timestamp))
+            for page_start, data in zip(starts, pages):
+                yield page_start // limit + 1, data
+        return
+
+    # Pipedrive advances next_start by limit, so upcoming pages can be requested before
+    # the current one arrives; requests past the end come back empty and are dropped
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        try:
+            while True:
+                while len(pending) < MAX_WORKERS:
+                    next_start = pending[-1][0] + limit if pending else start
+                    pending.append((next_start, executor.submit(
+                        get_organizations_page, next_start, limit, since_timestamp)))
+
+                start, future = pending.popleft()
+                data = future.result()
+                yield start // limit + 1, data
+
+                pagination = data.get('additional_data', {}).get('pagination', {})
+                if not pagination.get('more_items_in_collection', False):
+                    return
+
+                next_start = pagination.get('next_start', start + limit)
+                if next_start != start + limit:
+                    # Unexpected stride: discard the speculative pages and follow the API
+                    for _, speculative in pending:
+                        speculative.cancel()
+                    pending.clear()
+                start = next_start
+        finally:
+            for _, speculative in pending:
+                speculative.cancel()
 
 
 def get_customer_organizations():
-    """Get Customer organizations from Pipedrive with incremental sync support"""
+    """
+    Get Customer organizations from Pipedrive with incremental sync support
+
+    Returns (organizations, complete) where complete is True only for a full
+    (non-incremental) fetch in which every page was retrieved.
+    """
     logger = logging.getLogger(__name__)
     organizations = []
-    start = 0
-    limit = 100
+    complete = False
 
     since_timestamp = get_last_sync_timestamp()
 
     if since_timestamp:
-        logger.info(f"🔄 Performing incremental sync since: {since_timestamp}")
+        logger.info("🔄 Performing incremental sync since: %s", since_timestamp)
     else:
         logger.info("🔄 Performing full sync (no previous timestamp)")
 
-    while True:
-        try:
-            params = {
-                'api_token': PIPEDRIVE_API_KEY,
-                'start': start,
-                'limit': limit
-            }
-
-            if since_timestamp:
-                params['since'] = since_timestamp
-
-            response = requests.get(f"{PIPEDRIVE_BASE_URL}/organizations", params=params, timeout=30)
-            response.raise_for_status()
-
-            data = response.json()
+    try:
+        for page_number, data in iter_organization_pages(since_timestamp):
             page_orgs = data.get('data', [])
 
             if not page_orgs:
                 logger.info("No organizations returned from API")
                 break
 
-            # Filter for Customer organizations only (label 5)
+            # Filter for Customer organizations only (label 5); a no-op when the saved filter already did
             customer_orgs = [org for org in page_orgs if org.get('label') == 5]
 
             if customer_orgs:
                 org_ids = [str(org['id']) for org in customer_orgs]
                 phone_map = get_organizations_phone_numbers_batch(org_ids)
 
+                debug = logger.isEnabledFor(logging.DEBUG)
                 for org in customer_orgs:
                     org_id = org['id']
                     org['phone'] = phone_map.get(str(org_id), '')
-                    logger.debug(f"Org {org_id} ({org.get('name', 'Unknown')}) "
-                                 f"phone: {repr(org['phone'])}")
+                    if debug:
+                        logger.debug("Org %s (%s) phone: %r", org_id, org.get('name', 'Unknown'), org['phone'])
 
             organizations.extend(customer_orgs)
 
-            logger.info(f"Page {start // limit + 1}: Found {len(customer_orgs)} Customer organizations")
-
-            # Check pagination
-            pagination = data.get('additional_data', {}).get('pagination', {})
-            if not pagination.get('more_items_in_collection', False):
-                break
-
-            start = pagination.get('next_start', start + limit)
-            time.sleep(1)  # Rate limiting
+            logger.info("Page %s: Found %s Customer organizations", page_number, len(customer_orgs))
 
-        except Exception as e:
-            logger.error(f"Error fetching organizations: {e}")
-            break
+        complete = not since_timestamp
+    except Exception as e:
+        logger.error("Error fetching organizations: %s", e)
 
-    logger.info(f"Total Customer organizations found: {len(organizations)}")
+    logger.info("Total Customer organizations found: %s", len(organizations))
 
     if organizations or since_timestamp:
         update_sync_timestamp()
 
-    return organizations
+    return organizations, complete
 
 
 def clean_organization_data(org):
-    """Clean organization data"""
-    return {
-        'pipedrive_org_id': org['id'],
-        'name': (org.get('name') or '').strip(),
-        'phone': normalize_phone(org.get('phone', '')),
-        'email': (org.get('email') or '').strip(),
-        'city': (org.get('address_locality') or '').strip(),
-        'country': (org.get('address_country') or '').strip(),
-        'status': 'Customer',
-        'support_link': org.get('Common Support Link') or org.get('Main Support Link', ''),
-        'notes': (org.get('notes') or '').strip(),
-        'deal_title': (org.get('deal_title') or '').strip(),
-        'owner_name': org.get('owner_id', {}).get('name', '') if org.get('owner_id') else '',
-        'raw_data': json.dumps(org)
-    }
+    """Clean organization data into a row tuple in store_organizations column order"""
+    get = org.get
+    owner = get('owner_id')
+    return (
+        org['id'],
+        (get('name') or '').strip(),
+        normalize_phone(get('phone', '')),
+        get('Common Support Link') or get('Main Support Link', ''),
+        (get('address_locality') or '').strip(),
+        (get('address_country') or '').strip(),
+        (get('email') or '').strip(),
+        'Customer',
+        orjson.dumps(org).decode('utf-8'),
+        (get('notes') or '').strip(),
+        (get('deal_title') or '').strip(),
+        owner.get('name', '') if owner else ''
+    )
 
 
 def normalize_phone(phone):
@@ -359,9 +560,7 @@ def normalize_phone(phone):
     if not phone:
         return ""
 
-    phone = "".join(c for c in phone if c.isdigit() or c in "+() -")
-
-    phone = "".join(c for c in phone if c.isdigit() or c == "+")
+    phone = PHONE_STRIP_RE.sub("", phone)
 
     if not phone:
         return ""
@@ -370,262 +569,514 @@ def normalize_phone(phone):
         phone = phone.lstrip("0")
         phone = "+61" + phone
 
-    digits = "".join(c for c in phone if c.isdigit())
-    if len(digits) < 8 or len(digits) > 15:
+    digit_count = len(phone) - phone.count("+")
+    if not 8 <= digit_count <= 15:
         return ""
 
     return phone
 
 
-def store_organizations(organizations):
-    """Store organizations in database"""
+def store_organizations(organizations, prune=False):
+    """
+    Store organizations in database
+
+    With prune, organizations missing from the list are deleted; only pass it for a
+    complete fetch, or rows (and their Chatwoot links) for unfetched ones are lost.
+    """
+    logger = logging.getLogger(__name__)
+
+    with get_db_connection() as conn, conn.cursor() as cursor:
+        # Upsert so unchanged rows keep their Chatwoot link and sync state. The sync
+        # flags are assigned before the columns are overwritten (MySQL applies the
+        # assignments left to right). The contact is re-synced only when a field sent
+        # to Chatwoot changed; the Common Support Link, which only lives in data, is
+        # re-sent when it or the contact changed.
+        # Rows are positional tuples in column order, and the VALUES clause must contain
+        # only placeholders for executemany to send a multi-row INSERT.
+        unchanged = """(name, phone, support_link, city, country, status)
+            <=> (VALUES(name), VALUES(phone), VALUES(support_link),
+                 VALUES(city), VALUES(country), VALUES(status))"""
+        link_path = f'$."{COMMON_SUPPORT_LINK_FIELD}"'
+        link_unchanged = f"JSON_EXTRACT(data, '{link_path}') <=> JSON_EXTRACT(VALUES(data), '{link_path}')"
+        sql = f"""
+        INSERT INTO organizations
+          (pipedrive_org_id, name, phone, support_link, city, country,
+           email, status, data, notes, deal_title, owner_name)
+        VALUES
+          (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+          synced_to_chatwoot = IF({unchanged}, synced_to_chatwoot, 0),
+          common_support_synced_at = IF({unchanged} AND {link_unchanged}, common_support_synced_at, NULL),
+          name = VALUES(name), phone = VALUES(phone), support_link = VALUES(support_link),
+          city = VALUES(city), country = VALUES(country), email = VALUES(email),
+          status = VALUES(status), data = VALUES(data), notes = VALUES(notes),
+          deal_title = VALUES(deal_title), owner_name = VALUES(owner_name)
+        """
+
+        rows = [clean_organization_data(org) for org in organizations]
+
+        # One multi-row INSERT per batch keeps each statement under max_allowed_packet
+        for i in range(0, len(rows), INSERT_BATCH_SIZE):
+            batch = rows[i:i + INSERT_BATCH_SIZE]
+            cursor.executemany(sql, batch)
+            logger.info("Stored batch %s: %s organizations", i // INSERT_BATCH_SIZE + 1, len(batch))
+
+        # Organizations that are no longer customers drop out, in the same transaction
+        if prune:
+            placeholders = ', '.join(['%s'] * len(rows))
+            cursor.execute(
+                f"DELETE FROM organizations WHERE pipedrive_org_id NOT IN ({placeholders})",
+                [row[0] for row in rows]
+            )
+
+        conn.commit()
+        logger.info("Stored %s organizations in database", len(organizations))
+
+
+def get_cached_value(cache_key):
+    """Return an unexpired value from the sync_cache table, or None"""
     logger = logging.getLogger(__name__)
-    conn = get_db_connection()
 
     try:
-        with conn.cursor() as cursor:
-            cursor.execute("TRUNCATE TABLE organizations")
-
-            # Insert new data in batches to avoid long transactions
-            sql = """
-            INSERT INTO organizations
-              (pipedrive_org_id, name, phone, support_link, city, country,
-               email, status, data, notes, deal_title, owner_name,
-               synced_to_chatwoot)
-            VALUES
-              (%(pipedrive_org_id)s, %(name)s, %(phone)s, %(support_link)s,
-               %(city)s, %(country)s, %(email)s, %(status)s, %(raw_data)s,
-               %(notes)s, %(deal_title)s, %(owner_name)s, 0)
-            """
-
-            batch_size = int(os.getenv('BATCH_SIZE', 50))
-            for i in range(0, len(organizations), batch_size):
-                batch = organizations[i:i + batch_size]
-                for org in batch:
-                    cleaned_data = clean_organization_data(org)
-                    logger.debug(f"Storing org {cleaned_data['name']} with phone: {repr(cleaned_data['phone'])}")
-                    cursor.execute(sql, cleaned_data)
-                conn.commit()  # Commit each batch
-                logger.info(f"Stored batch {i // batch_size + 1}: {len(batch)} organizations")
-
-            logger.info(f"Stored {len(organizations)} organizations in database")
-
-    finally:
-        conn.close()
+        with get_db_connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT cache_value FROM sync_cache WHERE cache_key = %s AND expires_at > NOW()",
+                (cache_key,)
+            )
+            result = cursor.fetchone()
+            return result[0] if result else None
+    except Exception as e:
+        logger.warning("Error reading cached %s: %s", cache_key, e)
+        return None
+
+
+def set_cached_value(cache_key, cache_value, ttl_hours):
+    """Store a value in the sync_cache table for ttl_hours"""
+    logger = logging.getLogger(__name__)
+
+    try:
+        with get_db_connection() as conn, conn.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO sync_cache (cache_key, cache_value, expires_at)
+                VALUES (%s, %s, NOW() + INTERVAL %s HOUR)
+                ON DUPLICATE KEY UPDATE
+                cache_value = VALUES(cache_value), expires_at = VALUES(expires_at)
+            """, (cache_key, cache_value, ttl_hours))
+            conn.commit()
+    except Exception as e:
+        logger.warning("Error caching %s: %s", cache_key, e)
+
+
+def get_customer_database_inbox_id():
+    """Get the Customer Database inbox ID, from the sync cache when possible"""
+    logger = logging.getLogger(__name__)
+
+    cached_inbox_id = get_cached_value('customer_database_inbox_id')
+    if cached_inbox_id:
+        logger.info("Using cached Customer Database inbox ID: %s", cached_inbox_id)
+        return int(cached_inbox_id)
+
+    inboxes_url = f"{CHATWOOT_BASE_URL}/inboxes"
+    inboxes_response = CHATWOOT_SESSION.get(inboxes_url, timeout=30)
+
+    if inboxes_response.status_code == 200:
+        inboxes_data = orjson.loads(inboxes_response.content)
+        inboxes = inboxes_data.get('payload') or inboxes_data.get('data') or []
+        # Find the Customer Database inbox
+        for inbox in inboxes:
+            if 'customer database' in inbox.get('name', '').lower():
+                inbox_id = inbox.get('id')
+                logger.info("Using inbox: %s (ID: %s)", inbox.get('name'), inbox_id)
+                set_cached_value('customer_database_inbox_id', str(inbox_id), INBOX_CACHE_TTL_HOURS)
+                return inbox_id
+
+    return None
+
+
+def assign_unique_phone_numbers(organizations, phone_owners):
+    """
+    Return the phone number to send for each organization, dropping numbers owned by another one
+
+    phone_owners maps each phone shared by several organizations to the
+    pipedrive_org_id that keeps it; unshared phones are always kept.
+    """
+    logger = logging.getLogger(__name__)
+    phone_numbers = []
+
+    for org in organizations:
+        # Handle duplicate phone numbers by making them optional for all but one organization
+        normalized_phone = org['phone'] if org['phone'] else None
+        owner = phone_owners.get(normalized_phone) if normalized_phone else None
+        if owner is not None and owner != org['pipedrive_org_id']:
+            logger.info("Phone number %s already used, syncing %s without phone number",
+                        normalized_phone, org['name'])
+            normalized_phone = None  # Don't include phone for duplicates
+        phone_numbers.append(normalized_phone)
+
+    return phone_numbers
+
+
+def get_contact_pipedrive_identifier(contact):
+    """
+    Return the pipedrive_<id> identifier a Chatwoot contact belongs to, or None
+
+    Contacts created before identifiers were set still carry the Pipedrive ID in
+    their custom attributes.
+    """
+    identifier = contact.get('identifier')
+    if identifier:
+        return identifier
+    pipedrive_org_id = (contact.get('custom_attributes') or {}).get('pipedrive_org_id')
+    return f"pipedrive_{pipedrive_org_id}" if pipedrive_org_id else None
+
+
+def search_chatwoot_contact(identifier, name):
+    """
+    Find the Chatwoot contact for an organization, or None
+
+    Uses the contact filter API for exact matches on the pipedrive_<id> identifier
+    or, for legacy contacts not linked to any organization, on the name. A
+    same-named contact that belongs to another organization is never returned,
+    so two organizations with one name can't end up sharing a contact.
+    """
+    filter_url = f"{CHATWOOT_BASE_URL}/contacts/filter"
+    filter_data = {
+        'payload': [
+            {'attribute_key': 'identifier', 'filter_operator': 'equal_to', 'values': [identifier],
+             'query_operator': 'or'},
+            {'attribute_key': 'name', 'filter_operator': 'equal_to', 'values': [name]}
+        ]
+    }
+
+    filter_response = CHATWOOT_SESSION.post(filter_url, data=orjson.dumps(filter_data), timeout=30)
+
+    if filter_response.status_code == 200:
+        contacts = orjson.loads(filter_response.content).get('payload') or []
+        unlinked = None
+        for contact in contacts:
+            contact_identifier = get_contact_pipedrive_identifier(contact)
+            if contact_identifier == identifier:
+                return contact
+            if contact_identifier is None and unlinked is None:
+                unlinked = contact
+        return unlinked
+
+    return None
+
+
+def get_chatwoot_contacts_page(page):
+    """Get one page of the Chatwoot contact listing as (contacts, total_count)"""
+    response = CHATWOOT_SESSION.get(f"{CHATWOOT_BASE_URL}/contacts", params={'page': page}, timeout=30)
+    response.raise_for_status()
+    data = orjson.loads(response.content)
+    return data.get('payload', []), data.get('meta', {}).get('count', 0)
+
+
+def get_chatwoot_contacts_index(max_pages):
+    """
+    Index the full Chatwoot contact listing as (by_identifier, by_name) dicts
+
+    by_name is keyed by lower-cased contact name and only holds legacy contacts
+    not linked to any organization. Returns None when listing would take more
+    than max_pages requests, i.e. when searching each organization individually
+    is cheaper.
+    """
+    logger = logging.getLogger(__name__)
+
+    try:
+        first_page, total_count = get_chatwoot_contacts_page(1)
+        if not first_page:
+            return {}, {}
+
+        page_count = -(-total_count // len(first_page))
+        if page_count > max_pages:
+            logger.info("Chatwoot has %s contacts; searching per organization instead of listing", total_count)
+            return None
+
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            remaining_pages = executor.map(get_chatwoot_contacts_page, range(2, page_count + 1))
+            all_contacts = first_page + [contact for page, _ in remaining_pages for contact in page]
+    except Exception as e:
+        logger.warning("Could not list Chatwoot contacts, falling back to per-organization search: %s", e)
+        return None
+
+    contacts_by_identifier = {}
+    contacts_by_name = {}
+    for contact in all_contacts:
+        identifier = get_contact_pipedrive_identifier(contact)
+        if identifier:
+            contacts_by_identifier.setdefault(identifier, contact)
+            continue
+        # Only contacts not linked to any organization may be claimed by name
+        name_key = (contact.get('name') or '').strip().lower()
+        if name_key:
+            contacts_by_name.setdefault(name_key, contact)
+
+    logger.info("Loaded %s Chatwoot contacts in %s pages", len(all_contacts), page_count)
+    return contacts_by_identifier, contacts_by_name
+
+
+def assign_contact_to_inbox(chatwoot_id, name, inbox_id):
+    """Assign a Chatwoot contact to the Customer Database inbox, logging rather than raising on failure"""
+    logger = logging.getLogger(__name__)
+
+    try:
+        assign_url = f"{CHATWOOT_BASE_URL}/contacts/{chatwoot_id}/contact_inboxes"
+        assign_data = {
+            'inbox_id': inbox_id,
+            'source_id': f'pipedrive_{chatwoot_id}'
+        }
+
+        assign_response = CHATWOOT_SESSION.post(assign_url, data=orjson.dumps(assign_data), timeout=30)
+        if assign_response.status_code == 200:
+            logger.debug("✅ Assigned %s to Customer Database inbox", name)
+        else:
+            logger.warning("⚠️ Could not assign %s to inbox: %s", name, assign_response.status_code)
+    except Exception as e:
+        logger.warning("⚠️ Failed to assign %s to inbox: %s", name, e)
+
+
+def update_chatwoot_contact(chatwoot_id, name, contact_data, inbox_id):
+    """PUT contact_data to an existing contact, returning (response, inbox assignment future or None)"""
+    # The contact ID is already known, so the inbox assignment runs alongside the update
+    assign_future = None
+    if inbox_id:
+        assign_future = ASSIGN_EXECUTOR.submit(assign_contact_to_inbox, chatwoot_id, name, inbox_id)
+
+    update_url = f"{CHATWOOT_BASE_URL}/contacts/{chatwoot_id}"
+    response = CHATWOOT_SESSION.put(update_url, data=orjson.dumps(contact_data), timeout=30)
+    return response, assign_future
+
+
+def sync_organization(org, normalized_phone, customer_database_inbox_id, existing_contacts=None):
+    """
+    Create or update the Chatwoot contact for one organization
+
+    Organizations already linked to a contact (chatwoot_contact_id) are updated
+    directly; the rest are looked up in existing_contacts, an optional
+    (by_identifier, by_name) index from get_chatwoot_contacts_index, or searched.
+
+    Returns an (outcome, chatwoot_id) tuple where outcome is 'synced', 'error',
+    or 'skipped' (rate limited; retried on the next run).
+    """
+    logger = logging.getLogger(__name__)
+
+    name = org['name']
+    identifier = f"pipedrive_{org['pipedrive_org_id']}"
+
+    try:
+        # Prepare contact data
+        contact_data = {
+            'name': name,
+            'identifier': identifier,
+            'custom_attributes': {
+                'pipedrive_org_id': org['pipedrive_org_id'],
+                'type': 'organization',
+                'status': org['status'],
+                'city': org['city'],
+                'country': org['country'],
+                'support_link': org['support_link'],
+                'company_name': name,
+                'organization_name': name
+            }
+        }
+
+        if normalized_phone:
+            contact_data['phone_number'] = normalized_phone
+
+        response = None
+        assign_future = None
+
+        # The contact linked on an earlier run needs no lookup
+        chatwoot_id = org['chatwoot_contact_id']
+        if chatwoot_id:
+            response, assign_future = update_chatwoot_contact(chatwoot_id, name, contact_data,
+                                                              customer_database_inbox_id)
+            if response.status_code == 404:
+                logger.info("Chatwoot contact %s for %s no longer exists, relinking", chatwoot_id, name)
+                response = None
+
+        if response is None:
+            # The prefetched listing covers every contact, so a miss there means a new
+            # contact; search per organization only when no listing was loaded
+            if existing_contacts is not None:
+                contacts_by_identifier, contacts_by_name = existing_contacts
+                existing_contact = (contacts_by_identifier.get(identifier)
+                                    or contacts_by_name.get(name.strip().lower()))
+            else:
+                existing_contact = search_chatwoot_contact(identifier, name)
+
+            if existing_contact:
+                chatwoot_id = existing_contact['id']
+                response, assign_future = update_chatwoot_contact(chatwoot_id, name, contact_data,
+                                                                  customer_database_inbox_id)
+            else:
+                # Create new contact, already in the Customer Database inbox so no separate
+                # assignment request is needed
+                create_url = f"{CHATWOOT_BASE_URL}/contacts"
+                if customer_database_inbox_id:
+                    contact_data['inbox_id'] = customer_database_inbox_id
+
+                response = CHATWOOT_SESSION.post(create_url, data=orjson.dumps(contact_data), timeout=30)
+                if response.status_code == 200:
+                    response_data = orjson.loads(response.content)
+                    # Chatwoot API returns contact ID in payload.contact.id
+                    chatwoot_id = response_data.get('payload', {}).get('contact', {}).get('id')
+                else:
+                    chatwoot_id = None
+
+        if response.status_code == 429:
+            # Still throttled once the session's retries (which honour Retry-After) ran out
+            logger.warning("Rate limited, leaving %s for the next run", name)
+            return 'skipped', None
+
+        if response.status_code in [200, 201]:
+            # Wait for the existing contact's inbox assignment to finish
+            if assign_future:
+                assign_future.result()
+
+            logger.debug("✅ Synced: %s → Chatwoot ID %s", name, chatwoot_id)
+            return 'synced', chatwoot_id
+
+        logger.error("❌ Failed to sync: %s - %s", name, response.status_code)
+        logger.error("Response text: %s", response.text)
+        return 'error', None
+
+    except Exception as e:
+        logger.exception("❌ Error syncing %s: %s", name, e)
+        return 'error', None
 
 
 def sync_to_chatwoot():
     """Sync organizations to Chatwoot"""
     logger = logging.getLogger(__name__)
-    conn = get_db_connection()
 
-    try:
-        # Get the Customer Database inbox ID
-        inboxes_url = f"{CHATWOOT_BASE_URL}/inboxes"
-        inboxes_headers = {'Api-Access-Token': CHATWOOT_API_KEY}
-        inboxes_response = requests.get(inboxes_url, headers=inboxes_headers, timeout=30)
-
-        customer_database_inbox_id = None
-        if inboxes_response.status_code == 200:
-            inboxes_data = inboxes_response.json()
-            inboxes = inboxes_data.get('payload', inboxes_data.get('data', []))
-            # Find the Customer Database inbox
-            for inbox in inboxes:
-                if 'customer database' in inbox.get('name', '').lower():
-                    customer_database_inbox_id = inbox.get('id')
-                    logger.info(f"Using inbox: {inbox.get('name')} (ID: {customer_database_inbox_id})")
+    customer_database_inbox_id = get_customer_database_inbox_id()
+    if not customer_database_inbox_id:
+        logger.warning("Could not find Customer Database inbox, contacts may not be visible in Chatwoot interface")
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT COUNT(*), COUNT(*) - COUNT(chatwoot_contact_id)
+                FROM organizations WHERE synced_to_chatwoot = 0
+            """)
+            unsynced_count, unlinked_count = cursor.fetchone()
+            # Shared phones go to the lowest Pipedrive ID, decided up front so every
+            # organization can be synced independently of the others. Ownership spans
+            # all organizations: a changed one must not claim a phone that an already
+            # synced contact holds, or Chatwoot rejects it on every run
+            cursor.execute("""
+                SELECT phone, MIN(pipedrive_org_id) FROM organizations
+                WHERE phone <> ''
+                GROUP BY phone HAVING COUNT(*) > 1
+            """)
+            phone_owners = dict(cursor.fetchall())
+            # The server stalls on its side of the stream while we wait on Chatwoot;
+            # give it longer than the default 60s before it drops the connection
+            cursor.execute("SET SESSION net_write_timeout = 3600")
+
+        logger.info("Syncing %s organizations to Chatwoot", unsynced_count)
+
+        synced_count = 0
+        error_count = 0
+
+        # Only organizations not yet linked to a contact need a lookup; one paged listing
+        # replaces a search for each of them when it needs fewer requests
+        existing_contacts = get_chatwoot_contacts_index(max_pages=unlinked_count) if unlinked_count else None
+
+        batch_size = int(os.getenv('BATCH_SIZE', 50))
+
+        # Rows stream from an unbuffered cursor a batch at a time; the synced flags are
+        # written on a second connection because this one is busy until the stream ends
+        with conn.cursor(pymysql.cursors.SSDictCursor) as stream, \
+                get_db_connection() as update_conn, update_conn.cursor() as update_cursor, \
+                ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            # Only the columns the Chatwoot payload needs; the raw data JSON stays on the server
+            stream.execute("""
+                SELECT pipedrive_org_id, chatwoot_contact_id, name, phone, status, city, country, support_link
+                FROM organizations WHERE synced_to_chatwoot = 0
+            """)
+
+            while True:
+                organizations = stream.fetchmany(batch_size)
+                if not organizations:
                     break
 
-        if not customer_database_inbox_id:
-            logger.warning("Could not find Customer Database inbox, contacts may not be visible in Chatwoot interface")
-
-        with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-            cursor.execute("SELECT * FROM organizations WHERE synced_to_chatwoot = 0")
-            organizations = cursor.fetchall()
-
-            logger.info(f"Syncing {len(organizations)} organizations to Chatwoot")
-
-            synced_count = 0
-            error_count = 0
-            used_phone_numbers = set()
-
-            for org in organizations:
-                try:
-                    # Search for existing contact
-                    search_url = f"{CHATWOOT_BASE_URL}/contacts/search"
-                    search_params = {'q': org['name']}
-                    search_headers = {'Api-Access-Token': CHATWOOT_API_KEY}
-
-                    search_response = requests.get(search_url, params=search_params,
-                                                   headers=search_headers, timeout=30)
-
-                    if search_response.status_code == 429:
-                        logger.warning("Rate limited, waiting 60 seconds...")
-                        time.sleep(60)
-                        search_response = requests.get(search_url, params=search_params,
-                                                       headers=search_headers, timeout=30)
-
-                    existing_contact = None
-                    if search_response.status_code == 200:
-                        search_data = search_response.json()
-                        contacts = search_data.get('payload', search_data.get('data', []))
-                        if contacts:
-                            existing_contact = contacts[0]
-
-                    # Handle duplicate phone numbers by making them optional for subsequent organizations
-                    normalized_phone = org['phone'] if org['phone'] else None
-                    if normalized_phone and normalized_phone in used_phone_numbers:
-                        logger.info(f"Phone number {normalized_phone} already used, "
-                                    f"syncing {org['name']} without phone number")
-                        normalized_phone = None  # Don't include phone for duplicates
-                    elif normalized_phone:
-                        used_phone_numbers.add(normalized_phone)
-
-                    # Prepare contact data
-                    contact_data = {
-                        'name': org['name'],
-                        'custom_attributes': {
-                            'pipedrive_org_id': org['pipedrive_org_id'],
-                            'type': 'organization',
-                            'status': org['status'],
-                            'city': org['city'],
-                            'country': org['country'],
-                            'support_link': org['support_link'],
-                            'company_name': org['name'],
-                            'organization_name': org['name']
-                        }
-                    }
-
-                    if normalized_phone:
-                        contact_data['phone_number'] = normalized_phone
-
-                    # Create or update contact
-                    time.sleep(1)  # Rate limiting
-
-                    if existing_contact:
-                        # Update existing contact
-                        update_url = f"{CHATWOOT_BASE_URL}/contacts/{existing_contact['id']}"
-                        update_headers = {'Api-Access-Token': CHATWOOT_API_KEY,
-                                          'Content-Type': 'application/json'}
-
-                        response = requests.put(update_url, json=contact_data,
-                                                headers=update_headers, timeout=30)
-                        chatwoot_id = existing_contact['id']
-                    else:
-                        # Create new contact
-                        create_url = f"{CHATWOOT_BASE_URL}/contacts"
-                        create_headers = {'Api-Access-Token': CHATWOOT_API_KEY,
-                                          'Content-Type': 'application/json'}
-
-                        response = requests.post(create_url, json=contact_data,
-                                                 headers=create_headers, timeout=30)
-                        if response.status_code == 200:
-                            response_data = response.json()
-                            # Chatwoot API returns contact ID in payload.contact.id
-                            chatwoot_id = response_data.get('payload', {}).get('contact', {}).get('id')
-                        else:
-                            chatwoot_id = None
-
-                    if response.status_code == 429:
-                        logger.warning("Rate limited, waiting 60 seconds...")
-                        time.sleep(60)
-                        continue
-
-                    if response.status_code in [200, 201]:
-                        # Assign contact to Customer Database inbox if we have the inbox ID
-                        if chatwoot_id and customer_database_inbox_id:
-                            try:
-                                assign_url = f"{CHATWOOT_BASE_URL}/contacts/{chatwoot_id}/contact_inboxes"
-                                assign_data = {
-                                    'inbox_id': customer_database_inbox_id,
-                                    'source_id': f'pipedrive_{chatwoot_id}'
-                                }
-                                assign_headers = {
-                                    'Api-Access-Token': CHATWOOT_API_KEY,
-                                    'Content-Type': 'application/json'
-                                }
-
-                                assign_response = requests.post(
-                                    assign_url, json=assign_data,
-                                    headers=assign_headers, timeout=30)
-                                if assign_response.status_code == 200:
-                                    logger.info(f"✅ Assigned {org['name']} to Customer Database inbox")
-                                else:
-                                    logger.warning(
-                                        f"⚠️ Could not assign {org['name']} to inbox: "
-                                        f"{assign_response.status_code}")
-                            except Exception as e:
-                                logger.warning(f"⚠️ Failed to assign {org['name']} to inbox: {str(e)}")
-
-                        # Mark as synced
-                        cursor.execute(
-                            "UPDATE organizations SET synced_to_chatwoot = 1, "
-                            "chatwoot_contact_id = %s WHERE pipedrive_org_id = %s",
-                            (chatwoot_id, org['pipedrive_org_id'])
-                        )
-                        synced_count += 1
-                        logger.info(f"✅ Synced: {org['name']} → Chatwoot ID {chatwoot_id}")
-                    else:
+                phone_numbers = assign_unique_phone_numbers(organizations, phone_owners)
+
+                # Each organization is an independent search -> create/update -> assign chain;
+                # run them side by side and record results here, on the thread that owns the cursor
+                results = executor.map(sync_organization, organizations, phone_numbers,
+                                       repeat(customer_database_inbox_id), repeat(existing_contacts))
+
+                synced_rows = []
+                for org, (outcome, chatwoot_id) in zip(organizations, results):
+                    if outcome == 'synced':
+                        synced_rows.append((org['pipedrive_org_id'], chatwoot_id))
+                    elif outcome == 'error':
                         error_count += 1
-                        logger.error(f"❌ Failed to sync: {org['name']} - {response.status_code}")
-                        logger.error(f"Response text: {response.text}")
 
-                except Exception as e:
-                    error_count += 1
-                    logger.error(f"❌ Error syncing {org['name']}: {e}")
-                    import traceback
-                    logger.error(f"Full error: {traceback.format_exc()}")
+                # Mark the batch as synced once all of its workers are done. Every row already
+                # exists, so this upsert only updates; unlike an UPDATE, pymysql sends the whole
+                # batch as a single multi-row statement (all-placeholder VALUES are required for that)
+                if synced_rows:
+                    update_cursor.executemany("""
+                        INSERT INTO organizations (pipedrive_org_id, chatwoot_contact_id)
+                        VALUES (%s, %s)
+                        ON DUPLICATE KEY UPDATE
+                            chatwoot_contact_id = VALUES(chatwoot_contact_id),
+                            synced_to_chatwoot = 1
+                    """, synced_rows)
+                    update_conn.commit()
+                    synced_count += len(synced_rows)
+
+        logger.info("Sync completed: %s synced, %s errors", synced_count, error_count)
 
-            conn.commit()
-            logger.info(f"Sync completed: {synced_count} synced, {error_count} errors")
-
-            try:
-                with conn.cursor() as log_cursor:
-                    total_processed = synced_count + error_count
-                    status = 'success' if error_count == 0 else (
-                        'partial' if synced_count > 0 else 'error')
-
-                    log_cursor.execute("""
-                        INSERT INTO sync_log (sync_type, status, records_processed,
-                                            records_synced, error_message, completed_at)
-                        VALUES (%s, %s, %s, %s, %s, %s)
-                    """, (
-                        'organizations',
-                        status,
-                        total_processed,
-                        synced_count,
-                        f"{error_count} errors occurred" if error_count > 0 else None,
-                        datetime.now()
-                    ))
-                    conn.commit()
-            except Exception as e:
-                logger.warning(f"Failed to log sync results: {e}")
-
-            if total_processed > 0:
-                error_rate = (error_count / total_processed) * 100
-                if error_rate > 10:  # Alert if more than 10% errors
-                    send_sync_alert(
-                        'sync',
-                        'high error rate',
-                        f"Sync completed with high error rate: {error_rate:.1f}%",
-                        {
-                            'total_processed': total_processed,
-                            'synced_count': synced_count,
-                            'error_count': error_count,
-                            'error_rate': f"{error_rate:.1f}%"
-                        },
-                        'WARNING'
-                    )
-
-            log_with_extra(logger, 20, "Sync operation completed", {
-                'synced_count': synced_count,
-                'error_count': error_count,
-                'total_processed': total_processed,
-                'error_rate': f"{(error_count / total_processed * 100):.1f}%" if total_processed > 0 else "0%"
-            })
-
-    finally:
-        conn.close()
+        try:
+            with conn.cursor() as log_cursor:
+                total_processed = synced_count + error_count
+                status = 'success' if error_count == 0 else (
+                    'partial' if synced_count > 0 else 'error')
+
+                log_cursor.execute("""
+                    INSERT INTO sync_log (sync_type, status, records_processed,
+                                        records_synced, error_message, completed_at)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                """, (
+                    'organizations',
+                    status,
+                    total_processed,
+                    synced_count,
+                    f"{error_count} errors occurred" if error_count > 0 else None,
+                    datetime.now()
+                ))
+                conn.commit()
+        except Exception as e:
+            logger.warning("Failed to log sync results: %s", e)
+
+        if total_processed > 0:
+            error_rate = (error_count / total_processed) * 100
+            if error_rate > 10:  # Alert if more than 10% errors
+                send_sync_alert(
+                    'sync',
+                    'high error rate',
+                    f"Sync completed with high error rate: {error_rate:.1f}%",
+                    {
+                        'total_processed': total_processed,
+                        'synced_count': synced_count,
+                        'error_count': error_count,
+                        'error_rate': f"{error_rate:.1f}%"
+                    },
+                    'WARNING'
+                )
+
+        log_with_extra(logger, 20, "Sync operation completed", {
+            'synced_count': synced_count,
+            'error_count': error_count,
+            'total_processed': total_processed,
+            'error_rate': f"{(error_count / total_processed * 100):.1f}%" if total_processed > 0 else "0%"
+        })
 
 
 def main():
@@ -638,7 +1089,7 @@ def main():
     try:
         # Step 1: Get Customer organizations from Pipedrive
         logger.info("📥 Fetching Customer organizations from Pipedrive...")
-        organizations = get_customer_organizations()
+        organizations, complete = get_customer_organizations()
 
         if not organizations:
             logger.error("❌ No Customer organizations found")
@@ -653,7 +1104,8 @@ def main():
 
         # Step 2: Store in database
         logger.info("💾 Storing organizations in database...")
-        store_organizations(organizations)
+        # Only a complete full fetch shows which organizations are no longer customers
+        store_organizations(organizations, prune=complete)
 
         # Step 3: Sync to Chatwoot
         logger.info("🔄 Syncing organizations to Chatwoot...")
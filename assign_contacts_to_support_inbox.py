@@ -6,20 +6,18 @@ This script assigns contacts to support inbox with:
 - Structured logging with rotating file handlers
 - Connection pooling with requests.Session
 - API token permission validation
-- Batch assignment processing for efficiency
+- Batch assignment processing for efficiency, with a bounded worker pool
 - Comprehensive summary reporting (assigned, failed, skipped)
 - Error handling with retries and exponential backoff
 - Handles partial failures without halting execution
 """
 
-import time
 import logging
 import argparse
-import pymysql
 from utils.common import (
     setup_logging, get_db_connection, get_http_session,
-    retry_with_backoff, process_in_batches, ProgressReporter,
-    CHATWOOT_BASE_URL, validate_api_token
+    retry_with_backoff, process_in_batches, run_concurrently, ProgressReporter,
+    RateLimiter, CHATWOOT_BASE_URL, MAX_WORKERS, validate_api_token
 )
 
 SCRIPT_NAME = "assign_contacts_to_support_inbox"
@@ -35,12 +33,13 @@ def assign_contact_to_inbox(session, contact_id, contact_name, inbox_id, logger)
         'source_id': f'pipedrive_{contact_id}'
     }
 
-    response = session.post(assign_url, json=assign_data, timeout=30)
+    response = session.post(assign_url, json=assign_data)
     if response.status_code == 200:
-        logger.info(f"✅ Assigned {contact_name} to inbox {inbox_id}")
+        logger.info("✅ Assigned %s to inbox %s", contact_name, inbox_id)
         return True
     else:
-        logger.error(f"Could not assign {contact_name} to inbox {inbox_id}: {response.status_code} - {response.text}")
+        logger.error("Could not assign %s to inbox %s: %s - %s",
+                     contact_name, inbox_id, response.status_code, response.text)
         return False
 
 
@@ -48,7 +47,7 @@ def get_inbox_info(session, inbox_id, logger):
     """Get inbox information for validation"""
     try:
         inboxes_url = f"{CHATWOOT_BASE_URL}/inboxes"
-        response = session.get(inboxes_url, timeout=30)
+        response = session.get(inboxes_url)
 
         if response.status_code == 200:
             inboxes_data = response.json()
@@ -58,32 +57,37 @@ def get_inbox_info(session, inbox_id, logger):
                 if inbox.get('id') == inbox_id:
                     return inbox.get('name', f'Inbox {inbox_id}')
 
-        logger.warning(f"Could not find inbox with ID {inbox_id}")
+        logger.warning("Could not find inbox with ID %s", inbox_id)
         return f"Inbox {inbox_id}"
     except Exception as e:
-        logger.error(f"Error fetching inbox info: {e}")
+        logger.error("Error fetching inbox info: %s", e)
         return f"Inbox {inbox_id}"
 
 
-def process_contact_batch(session, contacts_batch, inbox_id, logger, progress_reporter):
-    """Process a batch of contacts for inbox assignment"""
-    for contact in contacts_batch:
-        contact_name = contact['name']
-        contact_id = contact['chatwoot_contact_id']
+def process_contact(session, contact, inbox_id, logger, progress_reporter, rate_limiter):
+    """Assign a single contact to the inbox"""
+    contact_name, contact_id = contact
 
-        progress_reporter.log_progress()
-        logger.info(f"Processing: {contact_name} (ID: {contact_id})")
+    progress_reporter.log_progress()
+    logger.info("Processing: %s (ID: %s)", contact_name, contact_id)
 
-        try:
-            if assign_contact_to_inbox(session, contact_id, contact_name, inbox_id, logger):
-                progress_reporter.update(success=True)
-            else:
-                progress_reporter.update(failed=True)
-        except Exception as e:
-            logger.error(f"Error assigning {contact_name}: {e}")
+    try:
+        rate_limiter.acquire()
+        if assign_contact_to_inbox(session, contact_id, contact_name, inbox_id, logger):
+            progress_reporter.update(success=True)
+        else:
             progress_reporter.update(failed=True)
+    except Exception as e:
+        logger.error("Error assigning %s: %s", contact_name, e)
+        progress_reporter.update(failed=True)
+
 
-        time.sleep(0.5)
+def process_contact_batch(session, contacts_batch, inbox_id, logger, progress_reporter, rate_limiter, max_workers):
+    """Process a batch of contacts for inbox assignment concurrently"""
+    run_concurrently(
+        lambda contact: process_contact(session, contact, inbox_id, logger, progress_reporter, rate_limiter),
+        contacts_batch, max_workers
+    )
 
 
 def main():
@@ -93,6 +97,8 @@ def main():
                         help=f'Target inbox ID (default: {CUSTOMER_DATABASE_INBOX_ID})')
     parser.add_argument('--batch-size', type=int,
                         help='Batch size for processing contacts')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS,
+                        help=f'Number of contacts assigned concurrently (default: {MAX_WORKERS})')
     parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
                         help='Logging level')
     args = parser.parse_args()
@@ -104,43 +110,46 @@ def main():
     logger.info("🔧 Starting contact assignment to support inbox")
     logger.info("=" * 60)
 
-    session = get_http_session()
+    rate_limiter = RateLimiter()
+    session = get_http_session(rate_limiter, args.workers)
 
     if not validate_api_token(session, logger):
         logger.error("❌ API token validation failed. Exiting.")
         return 1
 
     inbox_name = get_inbox_info(session, args.inbox_id, logger)
-    logger.info(f"📧 Target inbox: {inbox_name} (ID: {args.inbox_id})")
+    logger.info("📧 Target inbox: %s (ID: %s)", inbox_name, args.inbox_id)
 
     conn = get_db_connection()
     try:
-        with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+        with conn.cursor() as cursor:
             cursor.execute("SELECT name, chatwoot_contact_id FROM organizations WHERE chatwoot_contact_id IS NOT NULL")
             contacts = cursor.fetchall()
+            total = len(contacts)
 
             if not contacts:
                 logger.info("No contacts found to assign")
                 return 0
 
-            logger.info(f"📊 Found {len(contacts)} contacts to assign")
+            logger.info("📊 Found %s contacts to assign", total)
 
-            progress_reporter = ProgressReporter(len(contacts), logger,
+            progress_reporter = ProgressReporter(total, logger,
                                                  "Assigning contacts to inbox")
             batch_size = args.batch_size if args.batch_size else None
 
             for batch in process_in_batches(contacts, batch_size):
-                process_contact_batch(session, batch, args.inbox_id, logger, progress_reporter)
+                process_contact_batch(session, batch, args.inbox_id, logger, progress_reporter,
+                                      rate_limiter, args.workers)
 
             progress_reporter.log_summary()
 
             if progress_reporter.successful > 0:
                 base_url = CHATWOOT_BASE_URL.replace('/api/v1/accounts/2',
                                                      '/app/accounts/2/contacts')
-                logger.info(f"🔍 Check the contacts at: {base_url}")
+                logger.info("🔍 Check the contacts at: %s", base_url)
 
     except Exception as e:
-        logger.error(f"Database error: {e}")
+        logger.error("Database error: %s", e)
         return 1
     finally:
         conn.close()
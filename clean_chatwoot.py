@@ -6,18 +6,17 @@ This script provides safe contact cleanup with:
 - Structured logging with rotating file handlers
 - Connection pooling with requests.Session
 - Safeguard: requires explicit --confirm flag before deletion
-- Batch deletion to avoid rate-limit issues
+- Batch deletion with a bounded worker pool and a shared rate limiter
 - Logs all deleted contact IDs for audit trail
 - Error handling with retries and exponential backoff
 """
 
-import time
 import logging
 import argparse
 from utils.common import (
     setup_logging, get_http_session, retry_with_backoff,
-    process_in_batches, ProgressReporter, CHATWOOT_BASE_URL,
-    validate_api_token
+    process_in_batches, run_concurrently, ProgressReporter, RateLimiter,
+    CHATWOOT_BASE_URL, MAX_WORKERS, validate_api_token
 )
 
 SCRIPT_NAME = "clean_chatwoot"
@@ -29,21 +28,21 @@ def get_contacts_page(session, page, per_page, logger):
     url = f"{CHATWOOT_BASE_URL}/contacts"
     params = {'page': page, 'per_page': per_page}
 
-    logger.debug(f"Fetching page {page}...")
-    response = session.get(url, params=params, timeout=30)
+    logger.debug("Fetching page %s...", page)
+    response = session.get(url, params=params)
 
     if response.status_code != 200:
-        logger.error(f"Error fetching page {page}: {response.status_code}")
+        logger.error("Error fetching page %s: %s", page, response.status_code)
         return []
 
     data = response.json()
     contacts = data.get('payload', data.get('data', []))
-    logger.debug(f"Found {len(contacts)} contacts on page {page}")
+    logger.debug("Found %s contacts on page %s", len(contacts), page)
 
     return contacts
 
 
-def get_all_contacts(session, logger):
+def get_all_contacts(session, logger, rate_limiter):
     """Get all contacts from Chatwoot with pagination"""
     all_contacts = []
     page = 1
@@ -52,6 +51,7 @@ def get_all_contacts(session, logger):
     logger.info("📄 Fetching all contacts from Chatwoot...")
 
     while True:
+        rate_limiter.acquire()
         contacts = get_contacts_page(session, page, per_page, logger)
 
         if not contacts:
@@ -59,10 +59,9 @@ def get_all_contacts(session, logger):
             break
 
         all_contacts.extend(contacts)
-        logger.info(f"Page {page}: Found {len(contacts)} contacts (Total: {len(all_contacts)})")
+        logger.info("Page %s: Found %s contacts (Total: %s)", page, len(contacts), len(all_contacts))
 
         page += 1
-        time.sleep(0.5)
 
     return all_contacts
 
@@ -72,34 +71,40 @@ def delete_contact(session, contact_id, contact_name, logger):
     """Delete a single contact with retry logic"""
     url = f"{CHATWOOT_BASE_URL}/contacts/{contact_id}"
 
-    response = session.delete(url, timeout=30)
+    response = session.delete(url)
 
     if response.status_code in [200, 204]:
-        logger.info(f"✅ Deleted contact: {contact_name} (ID: {contact_id})")
+        logger.info("✅ Deleted contact: %s (ID: %s)", contact_name, contact_id)
         return True
     else:
-        logger.error(f"Failed to delete {contact_name} (ID: {contact_id}): {response.status_code}")
+        logger.error("Failed to delete %s (ID: %s): %s", contact_name, contact_id, response.status_code)
         return False
 
 
-def process_deletion_batch(session, contacts_batch, logger, progress_reporter):
-    """Process a batch of contacts for deletion"""
-    for contact in contacts_batch:
-        contact_id = contact['id']
-        contact_name = contact.get('name', f'Contact {contact_id}')
+def process_deletion(session, contact, logger, progress_reporter, rate_limiter):
+    """Delete a single contact, recording the outcome"""
+    contact_id = contact['id']
+    contact_name = contact.get('name', f'Contact {contact_id}')
 
-        progress_reporter.log_progress()
+    progress_reporter.log_progress()
 
-        try:
-            if delete_contact(session, contact_id, contact_name, logger):
-                progress_reporter.update(success=True)
-            else:
-                progress_reporter.update(failed=True)
-        except Exception as e:
-            logger.error(f"Error deleting {contact_name}: {e}")
+    try:
+        rate_limiter.acquire()
+        if delete_contact(session, contact_id, contact_name, logger):
+            progress_reporter.update(success=True)
+        else:
             progress_reporter.update(failed=True)
+    except Exception as e:
+        logger.error("Error deleting %s: %s", contact_name, e)
+        progress_reporter.update(failed=True)
+
 
-        time.sleep(0.5)
+def process_deletion_batch(session, contacts_batch, logger, progress_reporter, rate_limiter, max_workers):
+    """Process a batch of contacts for deletion concurrently"""
+    run_concurrently(
+        lambda contact: process_deletion(session, contact, logger, progress_reporter, rate_limiter),
+        contacts_batch, max_workers
+    )
 
 
 def main():
@@ -109,6 +114,8 @@ def main():
                         help='Required flag to confirm deletion of ALL contacts')
     parser.add_argument('--batch-size', type=int,
                         help='Batch size for deletion processing')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS,
+                        help=f'Number of concurrent deletions (default: {MAX_WORKERS})')
     parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
                         help='Logging level')
     args = parser.parse_args()
@@ -124,20 +131,21 @@ def main():
         logger.error("❌ --confirm flag is required to proceed with deletion")
         return 1
 
-    session = get_http_session()
+    rate_limiter = RateLimiter()
+    session = get_http_session(rate_limiter, args.workers)
 
     if not validate_api_token(session, logger):
         logger.error("❌ API token validation failed. Exiting.")
         return 1
 
     try:
-        contacts = get_all_contacts(session, logger)
+        contacts = get_all_contacts(session, logger, rate_limiter)
 
         if not contacts:
             logger.info("✅ No contacts found to delete")
             return 0
 
-        logger.info(f"📊 Found {len(contacts)} contacts to delete")
+        logger.info("📊 Found %s contacts to delete", len(contacts))
         logger.warning("⚠️ This will DELETE ALL contacts from Chatwoot!")
 
         final_confirm = input(f"\nType 'DELETE ALL {len(contacts)} CONTACTS' to proceed: ")
@@ -151,21 +159,21 @@ def main():
         batch_size = args.batch_size if args.batch_size else None
 
         for batch in process_in_batches(contacts, batch_size):
-            process_deletion_batch(session, batch, logger, progress_reporter)
+            process_deletion_batch(session, batch, logger, progress_reporter, rate_limiter, args.workers)
 
         progress_reporter.log_summary()
 
         if progress_reporter.successful > 0:
-            logger.info(f"🎉 Successfully deleted {progress_reporter.successful} contacts")
+            logger.info("🎉 Successfully deleted %s contacts", progress_reporter.successful)
 
         if progress_reporter.failed > 0:
-            logger.warning(f"⚠️ Failed to delete {progress_reporter.failed} contacts")
+            logger.warning("⚠️ Failed to delete %s contacts", progress_reporter.failed)
 
     except KeyboardInterrupt:
         logger.info("❌ Operation cancelled by user (Ctrl+C)")
         return 1
     except Exception as e:
-        logger.error(f"Unexpected error: {e}")
+        logger.error("Unexpected error: %s", e)
         return 1
     finally:
         session.close()
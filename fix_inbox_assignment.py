@@ -5,22 +5,20 @@ Production-ready one-time fix for incorrect inbox assignments.
 This script fixes inbox assignments with:
 - Structured logging with rotating file handlers
 - Connection pooling with requests.Session
-- Cross-checks existing contacts' inbox assignments
+- Cross-checks existing contacts' inbox assignments from one paginated contacts listing
 - Reassigns contacts where mismatch is found
-- Handles large datasets efficiently with batching
+- Handles large datasets efficiently with batching and a bounded worker pool
 - Logs all corrections (old inbox → new inbox)
 - Dry-run mode (--dry-run flag) to preview changes before execution
 - Error handling with retries and exponential backoff
 """
 
-import time
 import logging
 import argparse
-import pymysql
 from utils.common import (
     setup_logging, get_db_connection, get_http_session,
-    retry_with_backoff, process_in_batches, ProgressReporter,
-    CHATWOOT_BASE_URL, validate_api_token
+    retry_with_backoff, process_in_batches, run_concurrently, ProgressReporter,
+    RateLimiter, CHATWOOT_BASE_URL, MAX_WORKERS, validate_api_token
 )
 
 SCRIPT_NAME = "fix_inbox_assignment"
@@ -30,14 +28,14 @@ SCRIPT_NAME = "fix_inbox_assignment"
 def get_inboxes(session, logger):
     """Get all available inboxes"""
     inboxes_url = f"{CHATWOOT_BASE_URL}/inboxes"
-    response = session.get(inboxes_url, timeout=30)
+    response = session.get(inboxes_url)
 
     if response.status_code == 200:
         inboxes_data = response.json()
         inboxes = inboxes_data.get('payload', inboxes_data.get('data', []))
         return inboxes
     else:
-        logger.error(f"Failed to fetch inboxes: {response.status_code}")
+        logger.error("Failed to fetch inboxes: %s", response.status_code)
         return []
 
 
@@ -46,7 +44,7 @@ def find_support_inbox(inboxes, logger):
     for inbox in inboxes:
         inbox_name = inbox.get('name', '').lower()
         if 'support' in inbox_name or inbox.get('channel_type') == 'Channel::Email':
-            logger.info(f"Found support inbox: {inbox.get('name')} (ID: {inbox.get('id')})")
+            logger.info("Found support inbox: %s (ID: %s)", inbox.get('name'), inbox.get('id'))
             return inbox.get('id'), inbox.get('name')
 
     logger.warning("Could not find support inbox")
@@ -57,76 +55,135 @@ def find_support_inbox(inboxes, logger):
 def get_contact_inboxes(session, contact_id, logger):
     """Get current inbox assignments for a contact"""
     url = f"{CHATWOOT_BASE_URL}/contacts/{contact_id}/contact_inboxes"
-    response = session.get(url, timeout=30)
+    response = session.get(url)
 
     if response.status_code == 200:
         data = response.json()
         return data.get('payload', data.get('data', []))
     else:
-        logger.debug(f"Could not fetch inbox assignments for contact {contact_id}: {response.status_code}")
+        logger.debug("Could not fetch inbox assignments for contact %s: %s", contact_id, response.status_code)
         return []
 
 
+@retry_with_backoff()
+def get_contacts_page(session, page, logger):
+    """Get a page of contacts together with their inbox assignments"""
+    url = f"{CHATWOOT_BASE_URL}/contacts"
+    params = {'page': page, 'per_page': 50, 'include_contact_inboxes': 'true'}
+    response = session.get(url, params=params)
+
+    if response.status_code != 200:
+        logger.warning("Could not fetch contacts page %s: %s", page, response.status_code)
+        return None
+
+    data = response.json()
+    return data.get('payload', data.get('data', []))
+
+
+def get_contact_inbox_map(session, logger):
+    """Map every Chatwoot contact ID to its inbox IDs using the paginated contacts listing"""
+    inbox_map = {}
+    page = 1
+
+    while True:
+        contacts = get_contacts_page(session, page, logger)
+        if contacts is None:
+            logger.warning("Falling back to per-contact inbox lookups")
+            return {}
+        if not contacts:
+            break
+
+        for contact in contacts:
+            # Chatwoot versions that ignore include_contact_inboxes omit the key; leave
+            # those contacts out so they fall back to a per-contact lookup instead of
+            # looking unassigned
+            if 'contact_inboxes' not in contact:
+                continue
+            inbox_map[contact['id']] = [
+                contact_inbox.get('inbox_id') or (contact_inbox.get('inbox') or {}).get('id')
+                for contact_inbox in contact['contact_inboxes'] or []
+            ]
+
+        page += 1
+
+    logger.info("Loaded inbox assignments for %s contacts", len(inbox_map))
+    return inbox_map
+
+
 @retry_with_backoff()
 def assign_contact_to_inbox(session, contact_id, inbox_id, contact_name, logger):
     """Assign a contact to an inbox with retry logic"""
     assign_url = f"{CHATWOOT_BASE_URL}/contacts/{contact_id}/contact_inboxes"
     assign_data = {'inbox_id': inbox_id}
 
-    response = session.post(assign_url, json=assign_data, timeout=30)
+    response = session.post(assign_url, json=assign_data)
     if response.status_code == 200:
-        logger.info(f"✅ Assigned {contact_name} to inbox {inbox_id}")
+        logger.info("✅ Assigned %s to inbox %s", contact_name, inbox_id)
         return True
     else:
-        logger.error(f"Could not assign {contact_name} to inbox {inbox_id}: {response.status_code} - {response.text}")
+        logger.error("Could not assign %s to inbox %s: %s - %s",
+                     contact_name, inbox_id, response.status_code, response.text)
         return False
 
 
-def check_and_fix_contact(session, contact, target_inbox_id, inbox_name, dry_run, logger):
+def check_and_fix_contact(session, contact, target_inbox_id, inbox_name, dry_run, logger, inbox_map, rate_limiter):
     """Check and fix inbox assignment for a single contact"""
-    contact_name = contact['name']
-    contact_id = contact['chatwoot_contact_id']
+    contact_name, contact_id = contact
 
-    current_inboxes = get_contact_inboxes(session, contact_id, logger)
-    current_inbox_ids = [inbox.get('inbox_id') for inbox in current_inboxes]
+    current_inbox_ids = inbox_map.get(contact_id)
+    if current_inbox_ids is None:
+        rate_limiter.acquire()
+        current_inboxes = get_contact_inboxes(session, contact_id, logger)
+        current_inbox_ids = [inbox.get('inbox_id') for inbox in current_inboxes]
 
     if target_inbox_id in current_inbox_ids:
-        logger.debug(f"✅ {contact_name} already assigned to {inbox_name}")
+        logger.debug("✅ %s already assigned to %s", contact_name, inbox_name)
         return 'skipped'
 
     old_inboxes = ', '.join([str(id) for id in current_inbox_ids]) if current_inbox_ids else 'None'
-    logger.info(f"🔧 {contact_name}: {old_inboxes} → {target_inbox_id}")
+    logger.info("🔧 %s: %s → %s", contact_name, old_inboxes, target_inbox_id)
 
     if dry_run:
-        logger.info(f"[DRY RUN] Would assign {contact_name} to {inbox_name}")
+        logger.info("[DRY RUN] Would assign %s to %s", contact_name, inbox_name)
         return 'would_fix'
 
+    rate_limiter.acquire()
     if assign_contact_to_inbox(session, contact_id, target_inbox_id, contact_name, logger):
         return 'fixed'
     else:
         return 'failed'
 
 
-def process_contact_batch(session, contacts_batch, target_inbox_id, inbox_name, dry_run, logger, progress_reporter):
-    """Process a batch of contacts for inbox assignment checking/fixing"""
-    for contact in contacts_batch:
-        progress_reporter.log_progress()
+def process_contact(session, contact, target_inbox_id, inbox_name, dry_run, logger, progress_reporter,
+                    inbox_map, rate_limiter):
+    """Check and fix a single contact, recording the outcome"""
+    contact_name = contact[0]
+    progress_reporter.log_progress()
 
-        try:
-            result = check_and_fix_contact(session, contact, target_inbox_id, inbox_name, dry_run, logger)
+    try:
+        result = check_and_fix_contact(session, contact, target_inbox_id, inbox_name, dry_run, logger,
+                                       inbox_map, rate_limiter)
+
+        if result == 'fixed' or result == 'would_fix':
+            progress_reporter.update(success=True)
+        elif result == 'skipped':
+            progress_reporter.update(skipped=True)
+        else:
+            progress_reporter.update(failed=True)
 
-            if result == 'fixed' or result == 'would_fix':
-                progress_reporter.update(success=True)
-            elif result == 'skipped':
-                progress_reporter.update(skipped=True)
-            else:
-                progress_reporter.update(failed=True)
+    except Exception as e:
+        logger.error("Error processing %s: %s", contact_name, e)
+        progress_reporter.update(failed=True)
 
-        except Exception as e:
-            logger.error(f"Error processing {contact['name']}: {e}")
-            progress_reporter.update(failed=True)
 
-        time.sleep(0.5)
+def process_contact_batch(session, contacts_batch, target_inbox_id, inbox_name, dry_run, logger, progress_reporter,
+                          inbox_map, rate_limiter, max_workers):
+    """Process a batch of contacts for inbox assignment checking/fixing concurrently"""
+    run_concurrently(
+        lambda contact: process_contact(session, contact, target_inbox_id, inbox_name, dry_run, logger,
+                                        progress_reporter, inbox_map, rate_limiter),
+        contacts_batch, max_workers
+    )
 
 
 def main():
@@ -139,6 +196,8 @@ def main():
                              '(auto-detects support inbox if not provided)')
     parser.add_argument('--batch-size', type=int,
                         help='Batch size for processing contacts')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS,
+                        help=f'Number of contacts processed concurrently (default: {MAX_WORKERS})')
     parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
                         help='Logging level')
     args = parser.parse_args()
@@ -148,10 +207,11 @@ def main():
         logger.setLevel(getattr(logging, args.log_level))
 
     mode_text = "DRY RUN - " if args.dry_run else ""
-    logger.info(f"🔧 {mode_text}Starting inbox assignment fix")
+    logger.info("🔧 %sStarting inbox assignment fix", mode_text)
     logger.info("=" * 60)
 
-    session = get_http_session()
+    rate_limiter = RateLimiter()
+    session = get_http_session(rate_limiter, args.workers)
 
     if not validate_api_token(session, logger):
         logger.error("❌ API token validation failed. Exiting.")
@@ -160,7 +220,7 @@ def main():
     if args.target_inbox_id:
         target_inbox_id = args.target_inbox_id
         inbox_name = f"Inbox {target_inbox_id}"
-        logger.info(f"📧 Using specified inbox: {inbox_name}")
+        logger.info("📧 Using specified inbox: %s", inbox_name)
     else:
         inboxes = get_inboxes(session, logger)
         if not inboxes:
@@ -174,34 +234,37 @@ def main():
 
     conn = get_db_connection()
     try:
-        with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+        with conn.cursor() as cursor:
             cursor.execute("SELECT name, chatwoot_contact_id FROM organizations WHERE chatwoot_contact_id IS NOT NULL")
             contacts = cursor.fetchall()
+            total = len(contacts)
 
             if not contacts:
                 logger.info("No contacts found to process")
                 return 0
 
-            logger.info(f"📊 Found {len(contacts)} contacts to check")
+            logger.info("📊 Found %s contacts to check", total)
+
+            inbox_map = get_contact_inbox_map(session, logger)
 
             operation_name = ("Checking inbox assignments (DRY RUN)" if args.dry_run
                               else "Fixing inbox assignments")
-            progress_reporter = ProgressReporter(len(contacts), logger, operation_name)
+            progress_reporter = ProgressReporter(total, logger, operation_name)
             batch_size = args.batch_size if args.batch_size else None
 
             for batch in process_in_batches(contacts, batch_size):
-                process_contact_batch(session, batch, target_inbox_id, inbox_name,
-                                      args.dry_run, logger, progress_reporter)
+                process_contact_batch(session, batch, target_inbox_id, inbox_name, args.dry_run, logger,
+                                      progress_reporter, inbox_map, rate_limiter, args.workers)
 
             progress_reporter.log_summary()
 
             if args.dry_run:
                 logger.info("🔍 Dry run completed. Use without --dry-run to apply changes.")
             elif progress_reporter.successful > 0:
-                logger.info(f"🎉 Successfully fixed {progress_reporter.successful} contact assignments")
+                logger.info("🎉 Successfully fixed %s contact assignments", progress_reporter.successful)
 
     except Exception as e:
-        logger.error(f"Database error: {e}")
+        logger.error("Database error: %s", e)
         return 1
     finally:
         conn.close()
@@ -22,8 +22,10 @@ CREATE TABLE IF NOT EXISTS organizations (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     synced_to_chatwoot TINYINT(1) DEFAULT 0,
     chatwoot_contact_id INT NULL,
+    common_support_synced_at TIMESTAMP NULL,
     INDEX idx_pipedrive_org_id (pipedrive_org_id),
-    INDEX idx_synced_status (synced_to_chatwoot),
+    INDEX idx_orgs_synced_updated (synced_to_chatwoot, updated_at),
+    INDEX idx_orgs_phone_owner (phone, pipedrive_org_id),
     INDEX idx_chatwoot_id (chatwoot_contact_id)
 );
 
@@ -78,7 +80,7 @@ CREATE TABLE IF NOT EXISTS sync_log (
     completed_at TIMESTAMP NULL,
     INDEX idx_sync_type (sync_type),
     INDEX idx_status (status),
-    INDEX idx_started_at (started_at)
+    INDEX idx_sync_log_started_status (started_at, status)
 );
 
 CREATE TABLE IF NOT EXISTS sync_metadata (
@@ -88,6 +90,13 @@ CREATE TABLE IF NOT EXISTS sync_metadata (
     last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
 );
 
+-- Key/value cache for slow-changing Chatwoot lookups (e.g. the Customer Database inbox ID)
+CREATE TABLE IF NOT EXISTS sync_cache (
+    cache_key VARCHAR(64) PRIMARY KEY,
+    cache_value TEXT,
+    expires_at DATETIME NOT NULL
+);
+
 -- Create dedicated user for the sync application
 CREATE USER IF NOT EXISTS 'sync_user'@'%' IDENTIFIED BY 'sync_password_2024';
 GRANT SELECT, INSERT, UPDATE, DELETE ON pipedrive_chatwoot_sync.* TO 'sync_user'@'%';
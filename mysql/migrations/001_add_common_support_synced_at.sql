@@ -0,0 +1,7 @@
+-- Track when each organization's Common Support Link was pushed to Chatwoot
+-- so sync_common_support.py only processes contacts that still need it.
+-- Run once as root against existing databases (new installs get it from init.sql).
+USE pipedrive_chatwoot_sync;
+
+ALTER TABLE organizations
+    ADD COLUMN common_support_synced_at TIMESTAMP NULL AFTER chatwoot_contact_id;
@@ -0,0 +1,13 @@
+-- Composite indexes matching the monitor's hot-path predicates so its counters
+-- are answered from the index instead of scanning the tables. Each replaces a
+-- single-column index that is its leftmost prefix.
+-- Run once as root against existing databases (new installs get it from init.sql).
+USE pipedrive_chatwoot_sync;
+
+ALTER TABLE organizations
+    ADD INDEX idx_orgs_synced_updated (synced_to_chatwoot, updated_at),
+    DROP INDEX idx_synced_status;
+
+ALTER TABLE sync_log
+    ADD INDEX idx_sync_log_started_status (started_at, status),
+    DROP INDEX idx_started_at;
@@ -0,0 +1,10 @@
+-- Key/value cache so sync.py does not re-resolve the Customer Database inbox
+-- from Chatwoot's /inboxes endpoint on every run.
+-- Run once as root against existing databases (new installs get it from init.sql).
+USE pipedrive_chatwoot_sync;
+
+CREATE TABLE IF NOT EXISTS sync_cache (
+    cache_key VARCHAR(64) PRIMARY KEY,
+    cache_value TEXT,
+    expires_at DATETIME NOT NULL
+);
@@ -0,0 +1,8 @@
+-- Covering index for the sync's shared-phone ownership query (MIN(pipedrive_org_id)
+-- per phone across all organizations), so it is answered from the index alone
+-- instead of scanning the table.
+-- Run once as root against existing databases (new installs get it from init.sql).
+USE pipedrive_chatwoot_sync;
+
+ALTER TABLE organizations
+    ADD INDEX idx_orgs_phone_owner (phone, pipedrive_org_id);
@@ -6,95 +6,122 @@ This script syncs common support links (specialized feature) with:
 - Structured logging with rotating file handlers
 - Connection pooling with requests.Session
 - Error handling with retries and exponential backoff
-- Batch API calls for efficiency
+- Batch API calls for efficiency, processed concurrently by a bounded worker pool
 - Configurable via .env file
 - Proper label/custom attribute persistence
+- Skips contacts whose link was already synced (common_support_synced_at)
 """
 
-import json
-import time
 import logging
 import argparse
 import pymysql
 from utils.common import (
     setup_logging, get_db_connection, get_http_session,
-    retry_with_backoff, process_in_batches, ProgressReporter,
-    CHATWOOT_BASE_URL, validate_api_token
+    retry_with_backoff, process_in_batches, run_concurrently, ProgressReporter,
+    RateLimiter, CHATWOOT_BASE_URL, MAX_WORKERS, validate_api_token
 )
 
 SCRIPT_NAME = "sync_common_support"
+COMMON_SUPPORT_LINK_FIELD = 'f9c6c562ac9d61e1880fe4b5675d3a64f2bbcc6c'
+PENDING_CONTACTS_FILTER = ("chatwoot_contact_id IS NOT NULL AND data IS NOT NULL "
+                           "AND common_support_synced_at IS NULL")
 
 
 @retry_with_backoff()
-def sync_common_support(session, contact_id, contact_name, common_support_link, logger):
-    """Sync Common Support Link to Chatwoot with retry logic"""
-    update_url = f"{CHATWOOT_BASE_URL}/contacts/{contact_id}"
-
-    get_response = session.get(update_url, timeout=30)
-
-    if get_response.status_code != 200:
-        logger.warning(f"Could not fetch {contact_name}: {get_response.status_code}")
-        return False
+def sync_common_support(session, contact_id, contact_name, common_support_link, logger, check_existing=False):
+    """Sync Common Support Link to Chatwoot with retry logic
 
-    current_data = get_response.json()['payload']
-    current_additional_attrs = current_data.get('additional_attributes', {})
-    current_custom_attrs = current_data.get('custom_attributes', {})
+    Chatwoot merges custom/additional attributes on update, so only the link
+    keys are sent. With check_existing the current attributes are fetched and
+    merged client-side first, for Chatwoot versions that replace them.
+    """
+    update_url = f"{CHATWOOT_BASE_URL}/contacts/{contact_id}"
+    link_attrs = {
+        'common_support_link': common_support_link,
+        'support_link': common_support_link
+    }
 
-    updated_additional_attrs = current_additional_attrs.copy()
-    updated_additional_attrs['common_support_link'] = common_support_link
-    updated_additional_attrs['support_link'] = common_support_link
+    if check_existing:
+        get_response = session.get(update_url)
 
-    updated_custom_attrs = current_custom_attrs.copy()
-    updated_custom_attrs['common_support_link'] = common_support_link
-    updated_custom_attrs['support_link'] = common_support_link
+        if get_response.status_code != 200:
+            logger.warning("Could not fetch %s: %s", contact_name, get_response.status_code)
+            return False
 
-    update_data = {
-        'additional_attributes': updated_additional_attrs,
-        'custom_attributes': updated_custom_attrs
-    }
+        current_data = get_response.json()['payload']
+        update_data = {
+            'additional_attributes': {**current_data.get('additional_attributes', {}), **link_attrs},
+            'custom_attributes': {**current_data.get('custom_attributes', {}), **link_attrs}
+        }
+    else:
+        update_data = {
+            'additional_attributes': link_attrs,
+            'custom_attributes': link_attrs
+        }
 
-    response = session.put(update_url, json=update_data, timeout=30)
+    response = session.put(update_url, json=update_data)
     if response.status_code == 200:
         if common_support_link and common_support_link != 'None':
-            logger.info(f"✅ Updated {contact_name}: Common Support Link synced")
+            logger.info("✅ Updated %s: Common Support Link synced", contact_name)
         else:
-            logger.info(f"✅ Updated {contact_name}: No Common Support Link to sync")
+            logger.info("✅ Updated %s: No Common Support Link to sync", contact_name)
         return True
     else:
-        logger.error(f"Failed to update {contact_name}: {response.status_code} - {response.text}")
+        logger.error("Failed to update %s: %s - %s", contact_name, response.status_code, response.text)
         return False
 
 
-def process_contact_batch(session, contacts_batch, logger, progress_reporter):
-    """Process a batch of contacts"""
-    for contact in contacts_batch:
-        contact_name = contact['name']
-        contact_id = contact['chatwoot_contact_id']
+def process_contact(session, contact, logger, progress_reporter, rate_limiter, check_existing):
+    """Process a single contact, returning True when its link was synced"""
+    contact_name = contact['name']
+    contact_id = contact['chatwoot_contact_id']
 
-        progress_reporter.log_progress()
-        logger.info(f"Processing: {contact_name}")
+    progress_reporter.log_progress()
+    logger.info("Processing: %s", contact_name)
 
-        try:
-            pipedrive_data = json.loads(contact['data'])
-            common_support_link = pipedrive_data.get('f9c6c562ac9d61e1880fe4b5675d3a64f2bbcc6c', '')
+    try:
+        common_support_link = contact['common_support_link'] or ''
 
-            if common_support_link and common_support_link != 'None':
-                if sync_common_support(session, contact_id, contact_name, common_support_link, logger):
-                    progress_reporter.update(success=True)
-                else:
-                    progress_reporter.update(failed=True)
+        if common_support_link and common_support_link != 'None':
+            rate_limiter.acquire()
+            if sync_common_support(session, contact_id, contact_name, common_support_link, logger,
+                                   check_existing):
+                progress_reporter.update(success=True)
+                return True
             else:
-                logger.info(f"No Common Support Link found for {contact_name}")
-                progress_reporter.update(skipped=True)
+                progress_reporter.update(failed=True)
+        else:
+            logger.info("No Common Support Link found for %s", contact_name)
+            progress_reporter.update(skipped=True)
 
-        except json.JSONDecodeError:
-            logger.error(f"Invalid JSON data for {contact_name}")
-            progress_reporter.update(failed=True)
-        except Exception as e:
-            logger.error(f"Error processing {contact_name}: {e}")
-            progress_reporter.update(failed=True)
+    except Exception as e:
+        logger.error("Error processing %s: %s", contact_name, e)
+        progress_reporter.update(failed=True)
 
-        time.sleep(0.3)
+    return False
+
+
+def process_contact_batch(session, contacts_batch, logger, progress_reporter, rate_limiter, max_workers,
+                          check_existing=False):
+    """Process a batch of contacts concurrently, returning the IDs that were synced"""
+    results = run_concurrently(
+        lambda contact: process_contact(session, contact, logger, progress_reporter, rate_limiter, check_existing),
+        contacts_batch, max_workers
+    )
+    return [contact['chatwoot_contact_id'] for contact, synced in zip(contacts_batch, results) if synced]
+
+
+def mark_contacts_synced(cursor, contact_ids):
+    """Record that the Common Support Link has been pushed for these contacts"""
+    if not contact_ids:
+        return
+
+    # One statement per batch rather than one round-trip per contact
+    placeholders = ', '.join(['%s'] * len(contact_ids))
+    cursor.execute(
+        f"UPDATE organizations SET common_support_synced_at = NOW() WHERE chatwoot_contact_id IN ({placeholders})",
+        contact_ids
+    )
 
 
 def main():
@@ -102,6 +129,11 @@ def main():
     parser = argparse.ArgumentParser(description='Sync Common Support Links from Pipedrive to Chatwoot')
     parser.add_argument('--batch-size', type=int,
                         help='Batch size for processing contacts')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS,
+                        help=f'Number of contacts synced concurrently (default: {MAX_WORKERS})')
+    parser.add_argument('--check-existing', action='store_true',
+                        help='Fetch and merge current contact attributes before updating '
+                             '(only needed if Chatwoot replaces attributes on update)')
     parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
                         help='Logging level')
     args = parser.parse_args()
@@ -113,48 +145,69 @@ def main():
     logger.info("🔧 Starting Common Support Link sync to Chatwoot")
     logger.info("=" * 60)
 
-    session = get_http_session()
+    rate_limiter = RateLimiter()
+    session = get_http_session(rate_limiter, args.workers)
 
     if not validate_api_token(session, logger):
         logger.error("❌ API token validation failed. Exiting.")
         return 1
 
     conn = get_db_connection()
+    update_conn = get_db_connection()
     try:
-        with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-            cursor.execute("""
-                SELECT name, chatwoot_contact_id, data
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM organizations WHERE {PENDING_CONTACTS_FILTER}")
+            total_contacts = cursor.fetchone()[0]
+
+        if not total_contacts:
+            logger.info("No contacts found to sync")
+            return 0
+
+        logger.info("📊 Found %d contacts to sync", total_contacts)
+
+        progress_reporter = ProgressReporter(total_contacts, logger,
+                                             "Syncing Common Support Links")
+        batch_size = args.batch_size if args.batch_size else None
+
+        # Stream rows with an unbuffered cursor; updates go through a second
+        # connection because the streaming one is busy until fully consumed
+        with conn.cursor(pymysql.cursors.SSDictCursor) as cursor, update_conn.cursor() as update_cursor:
+            # The server stalls on its side of the stream while we wait on Chatwoot;
+            # give it longer than the default 60s before it drops the connection
+            cursor.execute("SET SESSION net_write_timeout = 3600")
+            # Extract only the link server-side instead of shipping and parsing the whole data blob
+            cursor.execute(f"""
+                SELECT name, chatwoot_contact_id,
+                       NULLIF(JSON_UNQUOTE(JSON_EXTRACT(data, %s)), 'null') AS common_support_link
                 FROM organizations
-                WHERE chatwoot_contact_id IS NOT NULL AND data IS NOT NULL
+                WHERE {PENDING_CONTACTS_FILTER}
                 ORDER BY name
-            """)
-            contacts = cursor.fetchall()
-
-            if not contacts:
-                logger.info("No contacts found to sync")
-                return 0
-
-            logger.info(f"📊 Found {len(contacts)} contacts to sync")
-
-            progress_reporter = ProgressReporter(len(contacts), logger,
-                                                 "Syncing Common Support Links")
-            batch_size = args.batch_size if args.batch_size else None
-
-            for batch in process_in_batches(contacts, batch_size):
-                process_contact_batch(session, batch, logger, progress_reporter)
-
-            progress_reporter.log_summary()
-
-            if progress_reporter.successful > 0:
-                logger.info("🎉 Common Support Links have been synced to Chatwoot!")
-                logger.info("Check the Chatwoot interface for the updated "
-                            "Common Support fields.")
+            """, (f'$."{COMMON_SUPPORT_LINK_FIELD}"',))
+
+            for batch in process_in_batches(cursor, batch_size):
+                synced_ids = process_contact_batch(session, batch, logger, progress_reporter,
+                                                   rate_limiter, args.workers, args.check_existing)
+                try:
+                    mark_contacts_synced(update_cursor, synced_ids)
+                    update_conn.commit()
+                except pymysql.MySQLError as e:
+                    # The PUT is idempotent, so unmarked contacts are simply retried next run
+                    logger.warning("Could not mark %d contacts as synced: %s", len(synced_ids), e)
+                    update_conn.rollback()
+
+        progress_reporter.log_summary()
+
+        if progress_reporter.successful > 0:
+            logger.info("🎉 Common Support Links have been synced to Chatwoot!")
+            logger.info("Check the Chatwoot interface for the updated "
+                        "Common Support fields.")
 
     except Exception as e:
-        logger.error(f"Database error: {e}")
+        logger.error("Database error: %s", e)
         return 1
     finally:
         conn.close()
+        update_conn.close()
         session.close()
 
     return 0
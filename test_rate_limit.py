@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Tests for the rate limiter's handling of X-RateLimit-* headers
+"""
+
+import time
+import unittest
+from unittest import mock
+
+from app.rate_limit import RateLimiter, MAX_RESET_DELAY
+
+
+def exhausted(reset):
+    """Response stub reporting an exhausted quota with the given reset header"""
+    return mock.Mock(headers={'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(reset)})
+
+
+class ObserveResetTest(unittest.TestCase):
+
+    def blocked_for(self, reset):
+        limiter = RateLimiter(3)
+        limiter.observe(exhausted(reset))
+        return limiter.blocked_until - time.monotonic()
+
+    def test_seconds_until_reset(self):
+        self.assertAlmostEqual(self.blocked_for(5), 5, delta=0.5)
+
+    def test_future_epoch_reset(self):
+        self.assertAlmostEqual(self.blocked_for(time.time() + 5), 5, delta=0.5)
+
+    def test_past_epoch_reset_does_not_block(self):
+        self.assertLessEqual(self.blocked_for(time.time() - 30), 0)
+
+    def test_reset_delay_is_capped(self):
+        self.assertLessEqual(self.blocked_for(time.time() + 10 * MAX_RESET_DELAY), MAX_RESET_DELAY)
+
+    def test_remaining_quota_does_not_block(self):
+        limiter = RateLimiter(3)
+        limiter.observe(mock.Mock(headers={'X-RateLimit-Remaining': '4', 'X-RateLimit-Reset': '5'}))
+        self.assertEqual(limiter.blocked_until, 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,13 +6,20 @@ Common utilities for Chatwoot utility scripts
 import os
 import sys
 import time
+import random
 import logging
+import threading
 import requests
 import pymysql
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
+from itertools import islice
 from logging.handlers import RotatingFileHandler
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
+from app.rate_limit import RateLimiter as BaseRateLimiter
+
 load_dotenv()
 
 DB_CONFIG = {
@@ -30,45 +37,49 @@ CHATWOOT_BASE_URL = os.getenv('CHATWOOT_BASE_URL', 'https://support.liveport.com
 BATCH_SIZE = int(os.getenv('BATCH_SIZE', '50'))
 RETRY_ATTEMPTS = int(os.getenv('RETRY_ATTEMPTS', '3'))
 RETRY_DELAY = int(os.getenv('RETRY_DELAY', '5'))
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+RETRY_JITTER = 0.5
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '10'))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv('CIRCUIT_RESET_TIMEOUT', '30'))
+HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', '30'))
+MAX_WORKERS = int(os.getenv('MAX_WORKERS', '4'))
+RATE_LIMIT_PER_SECOND = float(os.getenv('RATE_LIMIT_PER_SECOND', '3'))
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', '10485760'))
 LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
 
+_random = random.random
+
 
 def setup_logging(script_name):
-    """Set up structured logging with rotating file handlers"""
-    try:
-        sys.path.append('/app')
-        from logging_config import setup_logger
-        return setup_logger(script_name, f"{script_name}.log")
-    except ImportError:
-        log_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "logs")
-        os.makedirs(log_dir, exist_ok=True)
+    """Set up plain-text logging to <repo>/logs/<script_name>.log and stdout"""
+    log_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "logs")
+    os.makedirs(log_dir, exist_ok=True)
 
-        logger = logging.getLogger(script_name)
-        logger.setLevel(getattr(logging, LOG_LEVEL.upper()))
+    logger = logging.getLogger(script_name)
+    logger.setLevel(getattr(logging, LOG_LEVEL.upper()))
 
-        if logger.handlers:
-            return logger
+    if logger.handlers:
+        return logger
 
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
+    formatter = logging.Formatter(
+        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
 
-        file_handler = RotatingFileHandler(
-            os.path.join(log_dir, f"{script_name}.log"),
-            maxBytes=LOG_MAX_BYTES,
-            backupCount=LOG_BACKUP_COUNT
-        )
-        file_handler.setFormatter(formatter)
+    file_handler = RotatingFileHandler(
+        os.path.join(log_dir, f"{script_name}.log"),
+        maxBytes=LOG_MAX_BYTES,
+        backupCount=LOG_BACKUP_COUNT
+    )
+    file_handler.setFormatter(formatter)
 
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setFormatter(formatter)
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(formatter)
 
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
+    logger.addHandler(file_handler)
+    logger.addHandler(console_handler)
 
-        return logger
+    return logger
 
 
 def get_db_connection():
@@ -76,15 +87,105 @@ def get_db_connection():
     return pymysql.connect(**DB_CONFIG)
 
 
-def get_http_session():
-    """Get HTTP session with connection pooling"""
+class CircuitOpenError(Exception):
+    """Raised instead of calling Chatwoot while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker shared by every worker thread
+
+    After failure_threshold failures in a row (connection errors or 5xx responses
+    that survived the session's own retries) calls fail fast for reset_timeout
+    seconds. Calls are then let through on trial: a success closes the circuit
+    again, a single failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold=None, reset_timeout=None):
+        self.failure_threshold = failure_threshold or CIRCUIT_FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout or CIRCUIT_RESET_TIMEOUT
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def check(self):
+        """Raise CircuitOpenError while open; move to half-open once reset_timeout has passed"""
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                raise CircuitOpenError(f"Chatwoot circuit open after {self.failures} consecutive failures")
+            # Half-open: admit calls until the next result decides the state
+            self.opened_at = None
+            self.failures = self.failure_threshold - 1
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold and self.opened_at is None:
+                self.opened_at = time.monotonic()
+
+    def observe(self, response, *args, **kwargs):
+        """requests response hook counting final 5xx responses as failures"""
+        if response.status_code >= 500:
+            self.record_failure()
+        else:
+            self.record_success()
+
+
+CIRCUIT_BREAKER = CircuitBreaker()
+
+
+class TimeoutHTTPAdapter(requests.adapters.HTTPAdapter):
+    """HTTPAdapter that applies a default timeout to every request it sends"""
+
+    def __init__(self, *args, timeout=HTTP_TIMEOUT, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def get_http_session(rate_limiter=None, pool_size=None):
+    """Get HTTP session with a keep-alive connection pool sized for pool_size workers"""
+    if pool_size is None:
+        pool_size = MAX_WORKERS
+
     session = requests.Session()
     session.headers.update({'Api-Access-Token': CHATWOOT_API_KEY})
+    session.hooks['response'].append(CIRCUIT_BREAKER.observe)
+    if rate_limiter:
+        session.hooks['response'].append(rate_limiter.observe)
+
+    # Retry throttled/unavailable responses inside urllib3 so the pooled socket is
+    # reused; connection errors still raise and are handled by retry_with_backoff
+    retry_strategy = Retry(
+        total=RETRY_ATTEMPTS,
+        connect=0,
+        read=0,
+        status=RETRY_ATTEMPTS,
+        backoff_factor=RETRY_DELAY,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(['GET', 'POST', 'PUT', 'DELETE']),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
 
-    adapter = requests.adapters.HTTPAdapter(
-        pool_connections=10,
-        pool_maxsize=20,
-        max_retries=0
+    # All calls go to the single Chatwoot host; one socket per worker means
+    # concurrent workers never open throwaway connections
+    adapter = TimeoutHTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=pool_size,
+        pool_block=True,
+        max_retries=retry_strategy
     )
     session.mount('http://', adapter)
     session.mount('https://', adapter)
@@ -99,24 +200,33 @@ def retry_with_backoff(max_attempts=None, base_delay=None):
     if base_delay is None:
         base_delay = RETRY_DELAY
 
+    delays = tuple(base_delay * (2 ** attempt) for attempt in range(max_attempts))
+
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
             logger = logging.getLogger(func.__module__)
 
             for attempt in range(max_attempts):
+                # Fail fast while Chatwoot is down instead of piling retries onto it
+                CIRCUIT_BREAKER.check()
                 try:
                     return func(*args, **kwargs)
                 except requests.exceptions.RequestException as e:
+                    # The session never raises on status codes (those responses are counted by
+                    # its hook), so anything caught here is a connection-level failure
+                    CIRCUIT_BREAKER.record_failure()
                     if attempt == max_attempts - 1:
-                        logger.error(f"Final attempt failed for {func.__name__}: {e}")
+                        logger.error("Final attempt failed for %s: %s", func.__name__, e)
                         raise
 
-                    delay = base_delay * (2 ** attempt)
-                    logger.warning(f"Attempt {attempt + 1} failed for {func.__name__}: {e}. Retrying in {delay}s...")
+                    # Jitter by +/-RETRY_JITTER so concurrent workers don't retry in lockstep
+                    delay = delays[attempt] * (1 + (_random() * 2 - 1) * RETRY_JITTER)
+                    logger.warning("Attempt %d failed for %s: %s. Retrying in %.1fs...",
+                                   attempt + 1, func.__name__, e, delay)
                     time.sleep(delay)
                 except Exception as e:
-                    logger.error(f"Non-retryable error in {func.__name__}: {e}")
+                    logger.error("Non-retryable error in %s: %s", func.__name__, e)
                     raise
 
             return None
@@ -127,29 +237,49 @@ def retry_with_backoff(max_attempts=None, base_delay=None):
 def validate_api_token(session, logger):
     """Validate Chatwoot API token permissions"""
     try:
-        response = session.get(f"{CHATWOOT_BASE_URL}/profile", timeout=30)
+        response = session.get(f"{CHATWOOT_BASE_URL}/profile")
         if response.status_code == 200:
             logger.info("✅ API token validation successful")
             return True
         else:
-            logger.error(f"❌ API token validation failed: {response.status_code}")
+            logger.error("❌ API token validation failed: %s", response.status_code)
             return False
     except Exception as e:
-        logger.error(f"❌ API token validation error: {e}")
+        logger.error("❌ API token validation error: %s", e)
         return False
 
 
+class RateLimiter(BaseRateLimiter):
+    """Token bucket defaulting to RATE_LIMIT_PER_SECOND"""
+
+    def __init__(self, rate=None, burst=None):
+        super().__init__(rate if rate else RATE_LIMIT_PER_SECOND, burst)
+
+
 def process_in_batches(items, batch_size=None):
-    """Process items in batches"""
+    """Process items in batches; items may be any iterable, such as a streaming cursor"""
     if batch_size is None:
         batch_size = BATCH_SIZE
 
-    for i in range(0, len(items), batch_size):
-        yield items[i:i + batch_size]
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def run_concurrently(func, items, max_workers=None):
+    """Call func for each item on a bounded thread pool, returning results in order"""
+    if max_workers is None:
+        max_workers = MAX_WORKERS
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(func, items))
 
 
 class ProgressReporter:
-    """Progress reporting utility"""
+    """Progress reporting utility, safe to share between worker threads"""
 
     def __init__(self, total_items, logger, operation_name="Processing"):
         self.total_items = total_items
@@ -159,26 +289,29 @@ class ProgressReporter:
         self.successful = 0
         self.failed = 0
         self.skipped = 0
+        self._lock = threading.Lock()
 
     def update(self, success=False, failed=False, skipped=False):
         """Update progress counters"""
-        self.processed += 1
-        if success:
-            self.successful += 1
-        elif failed:
-            self.failed += 1
-        elif skipped:
-            self.skipped += 1
+        with self._lock:
+            self.processed += 1
+            if success:
+                self.successful += 1
+            elif failed:
+                self.failed += 1
+            elif skipped:
+                self.skipped += 1
 
     def log_progress(self, item_name="item"):
         """Log current progress"""
         percentage = (self.processed / self.total_items) * 100 if self.total_items > 0 else 0
-        self.logger.info(f"[{self.processed}/{self.total_items}] ({percentage:.1f}%) {self.operation_name}")
+        self.logger.info("[%d/%d] (%.1f%%) %s", self.processed, self.total_items, percentage,
+                         self.operation_name)
 
     def log_summary(self):
         """Log final summary"""
-        self.logger.info(f"\n✅ {self.operation_name} Summary:")
-        self.logger.info(f"   Total processed: {self.processed}")
-        self.logger.info(f"   Successful: {self.successful}")
-        self.logger.info(f"   Failed: {self.failed}")
-        self.logger.info(f"   Skipped: {self.skipped}")
+        self.logger.info("\n✅ %s Summary:", self.operation_name)
+        self.logger.info("   Total processed: %d", self.processed)
+        self.logger.info("   Successful: %d", self.successful)
+        self.logger.info("   Failed: %d", self.failed)
+        self.logger.info("   Skipped: %d", self.skipped)